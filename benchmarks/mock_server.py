@@ -0,0 +1,169 @@
+"""Serveur local imitant www.baillconnect.com pour les benchmarks (hors ligne).
+
+Sert `/client/connexion`, `/client/regulations`, `/client/regulations/{id}` et
+`/api-client/regulations/{id}` avec une latence et un taux d'erreur réglables,
+sur une topologie synthétique (N régulations × M thermostats/zones).
+"""
+import asyncio
+import random
+import secrets
+import urllib.parse
+from collections import Counter
+
+from aiohttp import web
+
+SESSION_COOKIE = "laravel_session"
+EMAIL = "bench@example.com"
+PASSWORD = "bench"
+
+
+def build_regulation(reg_id: int, devices: int) -> dict:
+    return {
+        "id": reg_id,
+        "uc_mode": 2,
+        "thermostats": [
+            {
+                "id": t,
+                "name": f"Pièce {t}",
+                "is_on": True,
+                "t1_t2": 1,
+                "setpoint_hot_t1": 20.0,
+                "setpoint_hot_t2": 18.0,
+                "setpoint_cool_t1": 25.0,
+                "setpoint_cool_t2": 27.0,
+                "temperature": 21.5,
+                "is_battery_low": False,
+            }
+            for t in range(1, devices + 1)
+        ],
+        "zones": [
+            {
+                "id": z,
+                "name": f"Zone {z}",
+                "mode": 3,
+                **{f"schedule_{j}_{h}": 1 if 7 <= h < 22 else 2 for j in range(7) for h in range(24)},
+            }
+            for z in range(1, devices + 1)
+        ],
+    }
+
+
+class MockBaillConnect:
+    """État et compteurs du faux portail BaillConnect."""
+
+    def __init__(self, regulations: int = 1, devices: int = 5, latency: float = 0.0,
+                 error_rate: float = 0.0, page_padding: int = 50_000, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.page_padding = page_padding
+        self.random = random.Random(seed)
+        self.regulations = {1000 + i: build_regulation(1000 + i, devices) for i in range(regulations)}
+        self.sessions: dict[str, dict] = {}
+        self.requests = Counter()
+        self.logins = 0
+
+    def reset_counters(self):
+        self.requests.clear()
+        self.logins = 0
+
+    # ------------------ Infrastructure ------------------
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/client/connexion", self._login_page)
+        app.router.add_post("/client/connexion", self._login)
+        app.router.add_get("/client/regulations", self._regulation_list)
+        app.router.add_get("/client/regulations/{reg_id:\\d+}", self._regulation_page)
+        app.router.add_post("/api-client/regulations/{reg_id:\\d+}", self._api)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        self.requests[f"{request.method} {route}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self.random.random() < self.error_rate:
+            return web.Response(status=500, text="Erreur simulée")
+
+        session_id = request.cookies.get(SESSION_COOKIE)
+        if session_id not in self.sessions:
+            session_id = secrets.token_hex(16)
+            self.sessions[session_id] = {"logged_in": False, "csrf": secrets.token_hex(20)}
+        request["session"] = self.sessions[session_id]
+
+        response = await handler(request)
+        response.set_cookie(SESSION_COOKIE, session_id, path="/")
+        response.set_cookie("XSRF-TOKEN", urllib.parse.quote(request["session"]["csrf"]), path="/")
+        return response
+
+    def _html(self, head: str, body: str = "") -> web.Response:
+        padding = "<p>" + "x" * self.page_padding + "</p>"
+        return web.Response(
+            text=f"<!DOCTYPE html><html><head>{head}</head><body>{body}{padding}</body></html>",
+            content_type="text/html",
+        )
+
+    # ------------------ Pages ------------------
+
+    async def _login_page(self, request: web.Request):
+        session = request["session"]
+        if session["logged_in"]:
+            return self._html("<title>Espace client</title>")
+        return self._html(
+            f'<meta name="csrf-token" content="{session["csrf"]}">',
+            f'<form method="post"><input type="hidden" name="_token" value="{session["csrf"]}"></form>',
+        )
+
+    async def _login(self, request: web.Request):
+        session = request["session"]
+        form = await request.post()
+        if form.get("_token") != session["csrf"] or form.get("email") != EMAIL or form.get("password") != PASSWORD:
+            return web.Response(status=401, text="Identifiants invalides")
+        session["logged_in"] = True
+        self.logins += 1
+        raise web.HTTPFound("/client/regulations")
+
+    async def _regulation_list(self, request: web.Request):
+        if not request["session"]["logged_in"]:
+            raise web.HTTPFound("/client/connexion")
+        links = "".join(f'<a href="/client/regulations/{reg_id}">Régulation</a>' for reg_id in self.regulations)
+        return self._html("<title>Régulations</title>", links)
+
+    async def _regulation_page(self, request: web.Request):
+        session = request["session"]
+        if not session["logged_in"]:
+            raise web.HTTPFound("/client/connexion")
+        if int(request.match_info["reg_id"]) not in self.regulations:
+            raise web.HTTPNotFound()
+        return self._html(f'<meta name="csrf-token" content="{session["csrf"]}">')
+
+    async def _api(self, request: web.Request):
+        session = request["session"]
+        if not session["logged_in"]:
+            return web.Response(status=401)
+        if request.headers.get("X-CSRF-TOKEN") != session["csrf"]:
+            return web.Response(status=419)
+        reg = self.regulations.get(int(request.match_info["reg_id"]))
+        if reg is None:
+            raise web.HTTPNotFound()
+
+        for key, value in (await request.json()).items():
+            parts = key.split(".")
+            if len(parts) == 1:
+                reg[key] = value
+            elif len(parts) == 3:
+                for record in reg.get(parts[0], []):
+                    if record["id"] == int(parts[1]):
+                        record[parts[2]] = value
+        return web.json_response({"data": reg})
+
+
+async def start_mock_server(mock: MockBaillConnect, host: str = "localhost", port: int = 0):
+    """Démarre le serveur ; retourne (runner, base_url)."""
+    runner = web.AppRunner(mock.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
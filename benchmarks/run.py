@@ -0,0 +1,163 @@
+"""Benchmark de bout en bout de l'intégration contre le faux portail local.
+
+Mesure, pour chaque topologie (régulations × thermostats/zones) :
+- le premier rafraîchissement à froid (connexion + découverte + lecture) ;
+- les cycles de polling à chaud (latence, requêtes par cycle, reconnexions) ;
+- l'aller-retour d'une commande via le writer et via les entités (climat, zone, mode).
+
+Usage : python -m benchmarks.run --regulations 1,4 --devices 2,8 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from benchmarks.mock_server import EMAIL, PASSWORD, MockBaillConnect, start_mock_server  # noqa: E402
+from custom_components.baillclim.climate import BaillclimClimate  # noqa: E402
+from custom_components.baillclim.coordinator import create_baillclim_coordinator  # noqa: E402
+from custom_components.baillclim.select import BaillclimModeSelect  # noqa: E402
+from custom_components.baillclim.switch import BoostRegistry, ZoneSwitch  # noqa: E402
+
+
+def _stats(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 2),
+        "max_ms": round(samples[-1] * 1000, 2),
+    }
+
+
+async def _timed(coro) -> float:
+    start = time.perf_counter()
+    await coro
+    return time.perf_counter() - start
+
+
+async def bench_topology(hass: HomeAssistant, regulations: int, devices: int, args) -> dict:
+    mock = MockBaillConnect(regulations, devices, latency=args.latency, error_rate=args.error_rate)
+    runner, base_url = await start_mock_server(mock)
+    coordinator = create_baillclim_coordinator(
+        hass, EMAIL, PASSWORD, max_concurrent=args.max_concurrent, base_url=base_url
+    )
+    try:
+        # ❄️ Premier rafraîchissement : connexion, découverte, lecture de toutes les régulations
+        cold = await _timed(coordinator.async_refresh())
+        cold_requests = sum(mock.requests.values())
+        if not coordinator.last_update_success:
+            raise RuntimeError(f"Premier rafraîchissement en échec : {coordinator.last_exception}")
+
+        # 🔁 Cycles à chaud
+        mock.reset_counters()
+        warm = [await _timed(coordinator.async_refresh()) for _ in range(args.cycles)]
+        warm_requests = sum(mock.requests.values()) / args.cycles
+        warm_logins = mock.logins
+
+        # ✍️ Commandes : writer brut puis méthodes des entités
+        reg_id = next(iter(mock.regulations))
+        boosts = BoostRegistry(hass)
+        climate = BaillclimClimate(coordinator, coordinator.get_thermostat(reg_id, 1), reg_id)
+        zone = ZoneSwitch(coordinator, boosts, reg_id, 1, "Zone 1")
+        select = BaillclimModeSelect(coordinator, reg_id, None)
+        for entity in (climate, zone, select):
+            entity.hass = hass
+
+        mock.reset_counters()
+        writes = {
+            "writer": [
+                await _timed(coordinator.writer.async_write(reg_id, {"thermostats.1.setpoint_hot_t1": 19 + i % 3}))
+                for i in range(args.commands)
+            ],
+            "climate": [
+                await _timed(climate.async_set_temperature(target_temp_low=20 + i % 3, target_temp_high=26))
+                for i in range(args.commands)
+            ],
+            "zone": [
+                await _timed(zone.async_turn_on() if i % 2 else zone.async_turn_off())
+                for i in range(args.commands)
+            ],
+            "select": [
+                await _timed(select.async_select_option("Chauffage" if i % 2 else "Froid"))
+                for i in range(args.commands)
+            ],
+        }
+        write_requests = sum(mock.requests.values()) / (len(writes) * args.commands)
+
+        return {
+            "regulations": regulations,
+            "devices": devices,
+            "cold_refresh_ms": round(cold * 1000, 2),
+            "cold_requests": cold_requests,
+            "warm": _stats(warm),
+            "warm_requests_per_cycle": round(warm_requests, 2),
+            "warm_logins": warm_logins,
+            "commands": {name: _stats(samples) for name, samples in writes.items()},
+            "requests_per_command": round(write_requests, 2),
+        }
+    finally:
+        await coordinator.session.async_close()
+        await runner.cleanup()
+
+
+def _print_table(results: list[dict]):
+    header = (
+        f"{'reg×dev':>8} {'froid ms':>9} {'req froid':>9} {'chaud p50':>9} {'req/cycle':>9} "
+        f"{'logins':>6} {'cmd p50 writer/climat/zone/mode':>34} {'req/cmd':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        commands = "/".join(f"{r['commands'][name]['p50_ms']:.0f}" for name in ("writer", "climate", "zone", "select"))
+        print(
+            f"{r['regulations']:>4}×{r['devices']:<3} {r['cold_refresh_ms']:>9.1f} {r['cold_requests']:>9} "
+            f"{r['warm']['p50_ms']:>9.1f} {r['warm_requests_per_cycle']:>9.1f} {r['warm_logins']:>6} "
+            f"{commands:>34} {r['requests_per_command']:>7.2f}"
+        )
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+async def main(args) -> list[dict]:
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        await hass.async_start()
+        try:
+            return [
+                await bench_topology(hass, regulations, devices, args)
+                for regulations in args.regulations
+                for devices in args.devices
+            ]
+        finally:
+            await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark BaillClim contre un faux portail BaillConnect local")
+    parser.add_argument("--regulations", type=_int_list, default=[1, 4], help="ex. 1,4,8")
+    parser.add_argument("--devices", type=_int_list, default=[2, 8], help="thermostats et zones par régulation")
+    parser.add_argument("--latency", type=float, default=0.02, help="latence serveur simulée (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="proportion de réponses HTTP 500")
+    parser.add_argument("--max-concurrent", type=int, default=3)
+    parser.add_argument("--cycles", type=int, default=10, help="cycles de polling à chaud")
+    parser.add_argument("--commands", type=int, default=5, help="commandes par type d'entité")
+    parser.add_argument("--json", action="store_true", help="sortie JSON au lieu du tableau")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    results = asyncio.run(main(args))
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        _print_table(results)
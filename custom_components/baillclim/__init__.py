@@ -1,16 +1,27 @@
 import logging
 from datetime import timedelta
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-
-from .const import DOMAIN
-from .coordinator import create_baillclim_coordinator
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import (
+    DEFAULT_MAX_CONCURRENT,
+    DEFAULT_MAX_UPDATE_INTERVAL,
+    DEFAULT_MIN_UPDATE_INTERVAL,
+    DOMAIN,
+)
+from .coordinator import async_remove_cache_store, async_remove_discovery_store, create_baillclim_coordinator
+from .services import async_setup_services
+from .session_manager import async_remove_session_store
+from .switch import async_remove_boost_store
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup(hass: HomeAssistant, config: dict):
     """Set up BaillClim from configuration.yaml (non utilisé, mais requis)."""
+    await async_setup_services(hass)
     return True
 
 
@@ -23,40 +34,49 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # 🔁 Options : priorité aux options (modifiables), sinon fallback sur data
     update_seconds = entry.options.get("update_interval", entry.data.get("update_interval", 60))
     timeout_seconds = entry.options.get("timeout", entry.data.get("timeout", 15))
+    max_concurrent = entry.options.get("max_concurrent", entry.data.get("max_concurrent", DEFAULT_MAX_CONCURRENT))
+    min_update_seconds = entry.options.get("min_update_interval", DEFAULT_MIN_UPDATE_INTERVAL)
+    max_update_seconds = entry.options.get("max_update_interval", DEFAULT_MAX_UPDATE_INTERVAL)
 
     coordinator = create_baillclim_coordinator(
         hass=hass,
         email=email,
         password=password,
         update_interval=timedelta(seconds=update_seconds),
-        timeout=timeout_seconds
+        timeout=timeout_seconds,
+        max_concurrent=max_concurrent,
+        entry_id=entry.entry_id,
+        min_update_interval=timedelta(seconds=min_update_seconds),
+        max_update_interval=timedelta(seconds=max_update_seconds),
     )
 
-    await coordinator.async_config_entry_first_refresh()
+    if await coordinator.async_load_cached_data():
+        # ⚡ Entités créées depuis le dernier snapshot connu, première lecture en arrière-plan
+        _LOGGER.info("⚡ Démarrage sur le dernier snapshot connu, rafraîchissement en arrière-plan")
+        entry.async_create_background_task(hass, coordinator.async_refresh(), f"{DOMAIN}_first_refresh")
+    else:
+        await coordinator.async_config_entry_first_refresh()
 
     if coordinator.data is None:
         _LOGGER.error("❌ Les données du coordinator sont vides. Abandon du setup.")
         return False
 
-    data = coordinator.data.get("data", {})
-
-    if not isinstance(data, dict):
-        _LOGGER.error(
-            "❌ Format inattendu pour coordinator.data['data'] : type=%s, contenu=%s",
-            type(data), data
-        )
-        return False
-
-    if "regulations" in data and not isinstance(data["regulations"], list):
-        _LOGGER.error(
-            "❌ 'regulations' devrait être une liste. Contenu : %s",
-            data["regulations"]
-        )
-        return False
-
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
+    @callback
+    def _async_topology_changed(added: set, removed: set):
+        # 🧩 Régulation retirée de BaillConnect : son appareil quitte l'entrée
+        device_registry = dr.async_get(hass)
+        for key in removed:
+            if key[0] != "regulation":
+                continue
+            device = device_registry.async_get_device(identifiers={(DOMAIN, f"baillclim_reg_{key[1]}")})
+            if device is not None:
+                device_registry.async_update_device(device.id, remove_config_entry_id=entry.entry_id)
+
+    entry.async_on_unload(async_dispatcher_connect(hass, coordinator.topology_signal, _async_topology_changed))
+
     await hass.config_entries.async_forward_entry_setups(entry, [
         "sensor",
         "climate",
@@ -79,6 +99,18 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     ])
 
     if unload_ok and DOMAIN in hass.data:
-        hass.data[DOMAIN].pop(entry.entry_id, None)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id, None)
+        if coordinator is not None:
+            # Plus aucun envoi ni relecture ne doit rouvrir la session après le déchargement
+            await coordinator.writer.async_shutdown()
+            await coordinator.session.async_close()
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove persisted data when the config entry is deleted."""
+    await async_remove_session_store(hass, entry.entry_id)
+    await async_remove_discovery_store(hass, entry.entry_id)
+    await async_remove_cache_store(hass, entry.entry_id)
+    await async_remove_boost_store(hass, entry.entry_id)
@@ -10,15 +10,15 @@ from homeassistant.const import UnitOfTemperature
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
-from .session_manager import SessionManager
+from .const import DOMAIN, UC_MODE_NAMES
+from .entity import BaillclimEntity, async_setup_topology
+from .model import Thermostat
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class BaillclimClimate(CoordinatorEntity, ClimateEntity):
+class BaillclimClimate(BaillclimEntity, ClimateEntity):
     # Ajout du support des presets (ECO / CONFORT)
     _attr_supported_features = (
         ClimateEntityFeature.TARGET_TEMPERATURE_RANGE
@@ -32,13 +32,15 @@ class BaillclimClimate(CoordinatorEntity, ClimateEntity):
     # Liste des presets disponibles
     _attr_preset_modes = [PRESET_COMFORT, PRESET_ECO]
 
-    def __init__(self, coordinator, thermostat, reg_id):
+    def __init__(self, coordinator, thermostat: Thermostat, reg_id):
         super().__init__(coordinator)
         self._reg_id = reg_id
-        self._id = thermostat.get("id")
-        self._name = thermostat.get("name", f"Thermostat {self._id}").strip()
+        self._id = thermostat.id
+        self._name = thermostat.name
         self._attr_name = f"Climatiseur {self._name}"
         self._attr_unique_id = f"baillclim_climate_{self._reg_id}_{self._id}"
+        self._change_keys = (("thermostat", reg_id, self._id), ("regulation", reg_id))
+        self._topology_key = ("thermostat", reg_id, self._id)
 
         # cache local pour le preset (si jamais l'API ne renvoie pas une valeur claire)
         self._preset_mode = PRESET_COMFORT
@@ -46,22 +48,18 @@ class BaillclimClimate(CoordinatorEntity, ClimateEntity):
     # ------------------ Lecture des données ------------------
 
     @property
-    def _thermostat_data(self):
-        try:
-            data = self.coordinator.data.get("data", {})
-            for reg in data.get("regulations", []):
-                reg_data = reg.get("data", {}).get("data", {})
-                if reg_data.get("id") == self._reg_id:
-                    for t in reg_data.get("thermostats", []):
-                        if t.get("id") == self._id:
-                            return t
-        except Exception as e:
-            _LOGGER.warning("Erreur lecture thermostat_data : %s", e)
-        return {}
+    def _thermostat_data(self) -> Thermostat | None:
+        return self.coordinator.get_thermostat(self._reg_id, self._id)
+
+    @property
+    def _t1_t2(self):
+        th = self._thermostat_data
+        return th.t1_t2 if th else None
 
     @property
     def hvac_mode(self):
-        return HVACMode.AUTO if self._thermostat_data.get("is_on") else HVACMode.OFF
+        th = self._thermostat_data
+        return HVACMode.AUTO if th and th.is_on else HVACMode.OFF
 
     @property
     def target_temperature_low(self):
@@ -72,11 +70,12 @@ class BaillclimClimate(CoordinatorEntity, ClimateEntity):
         - En mode ECO     (t1_t2 = 2) → setpoint_hot_t2
         """
         th = self._thermostat_data
-        t1_t2 = th.get("t1_t2", 1)
+        if th is None:
+            return None
 
-        if t1_t2 == 2:
-            return th.get("setpoint_hot_t2")
-        return th.get("setpoint_hot_t1")
+        if th.t1_t2 == 2:
+            return th.setpoint_hot_t2
+        return th.setpoint_hot_t1
 
     @property
     def target_temperature_high(self):
@@ -87,15 +86,17 @@ class BaillclimClimate(CoordinatorEntity, ClimateEntity):
         - En mode ECO     (t1_t2 = 2) → setpoint_cool_t2
         """
         th = self._thermostat_data
-        t1_t2 = th.get("t1_t2", 1)
+        if th is None:
+            return None
 
-        if t1_t2 == 2:
-            return th.get("setpoint_cool_t2")
-        return th.get("setpoint_cool_t1")
+        if th.t1_t2 == 2:
+            return th.setpoint_cool_t2
+        return th.setpoint_cool_t1
 
     @property
     def current_temperature(self):
-        return self._thermostat_data.get("temperature")
+        th = self._thermostat_data
+        return th.temperature if th else None
 
     # ------------------ ECO / CONFORT (presets) ------------------
 
@@ -107,8 +108,7 @@ class BaillclimClimate(CoordinatorEntity, ClimateEntity):
           1 = T1 = Confort
           2 = T2 = Eco
         """
-        th = self._thermostat_data
-        t1_t2 = th.get("t1_t2")
+        t1_t2 = self._t1_t2
 
         if t1_t2 == 2:
             return PRESET_ECO
@@ -132,38 +132,24 @@ class BaillclimClimate(CoordinatorEntity, ClimateEntity):
         key = f"thermostats.{self._id}.t1_t2"
 
         await self._set_api_value(key, t1_t2_value)
-        await self.coordinator.async_request_refresh()
 
     # ------------------ Attributs supplémentaires ------------------
 
     @property
     def extra_state_attributes(self):
-        try:
-            data = self.coordinator.data.get("data", {})
-            for reg in data.get("regulations", []):
-                reg_data = reg.get("data", {}).get("data", {})
-                if reg_data.get("id") == self._reg_id:
-                    mode = reg_data.get("uc_mode", 0)
-                    MODES = {
-                        0: "Arrêt",
-                        1: "Froid",
-                        2: "Chauffage",
-                        3: "Désumidificateur",
-                        4: "Ventilation"
-                    }
-
-                    th = self._thermostat_data
-                    t1_t2 = th.get("t1_t2")
-
-                    return {
-                        "uc_mode": mode,
-                        "mode_nom": MODES.get(mode, "Inconnu"),
-                        "t1_t2": t1_t2,
-                        "preset_mode": self.preset_mode,
-                    }
-        except Exception as e:
-            _LOGGER.warning("Erreur extra_state_attributes : %s", e)
-        return {}
+        regulation = self.coordinator.get_regulation(self._reg_id)
+        if not regulation:
+            return {}
+
+        mode = regulation.uc_mode if regulation.uc_mode is not None else 0
+
+        return {
+            **(super().extra_state_attributes or {}),
+            "uc_mode": mode,
+            "mode_nom": UC_MODE_NAMES.get(mode, "Inconnu"),
+            "t1_t2": self._t1_t2,
+            "preset_mode": self.preset_mode,
+        }
 
     @property
     def device_info(self):
@@ -180,7 +166,6 @@ class BaillclimClimate(CoordinatorEntity, ClimateEntity):
     async def async_set_hvac_mode(self, hvac_mode):
         is_on = hvac_mode != HVACMode.OFF
         await self._set_api_value(f"thermostats.{self._id}.is_on", is_on)
-        await self.coordinator.async_request_refresh()
 
     async def async_set_temperature(self, **kwargs):
         """
@@ -189,54 +174,25 @@ class BaillclimClimate(CoordinatorEntity, ClimateEntity):
         - si t1_t2 = 1 (CONFORT) → écrit dans T1
         - si t1_t2 = 2 (ECO)     → écrit dans T2
         """
-        th = self._thermostat_data
-        t1_t2 = th.get("t1_t2", 1)
+        t1_t2 = self._t1_t2
+        payload = {}
 
         # Chauffage
         if "target_temp_low" in kwargs:
             key = "setpoint_hot_t2" if t1_t2 == 2 else "setpoint_hot_t1"
-            await self._set_api_value(
-                f"thermostats.{self._id}.{key}",
-                kwargs["target_temp_low"],
-            )
+            payload[f"thermostats.{self._id}.{key}"] = kwargs["target_temp_low"]
 
         # Froid
         if "target_temp_high" in kwargs:
             key = "setpoint_cool_t2" if t1_t2 == 2 else "setpoint_cool_t1"
-            await self._set_api_value(
-                f"thermostats.{self._id}.{key}",
-                kwargs["target_temp_high"],
-            )
+            payload[f"thermostats.{self._id}.{key}"] = kwargs["target_temp_high"]
 
-        await self.coordinator.async_request_refresh()
+        # Une seule requête pour les deux consignes
+        if payload:
+            await self.coordinator.writer.async_write(self._reg_id, payload)
 
     async def _set_api_value(self, key, value):
-        await SessionManager.async_initialize(
-            self.hass,
-            self.coordinator.config_entry.data["email"],
-            self.coordinator.config_entry.data["password"],
-            reg_id=self._reg_id
-        )
-        session = await SessionManager.async_get_session(self.hass)
-        url = f"https://www.baillconnect.com/api-client/regulations/{self._reg_id}"
-        payload = {key: value}
-
-        def send():
-            try:
-                response = session.post(url, json=payload, timeout=10)
-                if response.status_code == 200:
-                    _LOGGER.info("✅ API OK : %s = %s", key, value)
-                else:
-                    _LOGGER.warning(
-                        "❌ API ERROR (%s = %s) : %s",
-                        key,
-                        value,
-                        response.text,
-                    )
-            except Exception as e:
-                _LOGGER.error("Erreur requête API %s : %s", key, e)
-
-        await self.hass.async_add_executor_job(send)
+        await self.coordinator.writer.async_write(self._reg_id, {key: value})
 
 
 async def async_setup_entry(
@@ -247,20 +203,13 @@ async def async_setup_entry(
     coordinator = hass.data[DOMAIN][entry.entry_id]
     coordinator.config_entry = entry
 
-    if not coordinator.data:
+    if coordinator.data is None:
         _LOGGER.error("❌ Données manquantes dans le coordinator.")
         return
 
-    data = coordinator.data.get("data", {})
-    regulations = data.get("regulations", [])
-
-    entities = []
-    for reg in regulations:
-        reg_data = reg.get("data", {}).get("data", {})
-        reg_id = reg_data.get("id")
-        if reg_id is None:
-            continue
-        for th in reg_data.get("thermostats", []):
-            entities.append(BaillclimClimate(coordinator, th, reg_id))
+    def _entities(key):
+        if key[0] == "thermostat":
+            yield BaillclimClimate(coordinator, coordinator.get_thermostat(key[1], key[2]), key[1])
 
-    async_add_entities(entities)
+    # 🧩 Thermostats actuels, puis ceux qui apparaissent (sans recharger l'entrée)
+    async_setup_topology(hass, entry, coordinator, async_add_entities, _entities)
@@ -1,2 +1,40 @@
 DOMAIN = "baillclim"
-LOGIN_URL = "https://www.baillconnect.com/client/connexion"
+BASE_URL = "https://www.baillconnect.com"
+LOGIN_PATH = "/client/connexion"
+REGULATIONS_PATH = "/client/regulations"
+API_REGULATIONS_PATH = "/api-client/regulations"
+USER_AGENT = "HomeAssistant-BaillClim/1.0"
+
+# 🌀 Mode général de la régulation (uc_mode)
+UC_MODE_NAMES = {
+    0: "Arrêt",
+    1: "Froid",
+    2: "Chauffage",
+    3: "Désumidificateur",
+    4: "Ventilation"
+}
+
+# ⏱️ Timeout de connexion TCP/TLS (le timeout global reste celui des options)
+CONNECT_TIMEOUT = 10
+
+# 🚦 Appels simultanés vers BaillConnect et espacement minimal entre deux départs (s)
+DEFAULT_MAX_CONCURRENT = 3
+REQUEST_SPACING = 0.25
+
+# 📦 Fenêtre de regroupement des commandes d'une même régulation (s)
+WRITE_BATCH_DELAY = 0.3
+
+# ⏳ Polling adaptatif : plancher après une commande/un changement, plafond au repos (s)
+DEFAULT_MIN_UPDATE_INTERVAL = 15
+DEFAULT_MAX_UPDATE_INTERVAL = 300
+POLL_BACKOFF_FACTOR = 2
+
+# 🔁 Réessais (backoff exponentiel + jitter) et disjoncteur
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 60.0
+
+# 🔎 Redécouverte des régulations du compte (liste mise en cache et persistée) (s)
+DISCOVERY_INTERVAL = 6 * 3600
@@ -1,91 +1,490 @@
+import asyncio
+import hashlib
 import logging
-import re
-import time
-from datetime import timedelta
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from datetime import datetime, timedelta
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.json import json_bytes
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN
-from .session_manager import SessionManager
+from .const import (
+    BASE_URL,
+    DEFAULT_MAX_CONCURRENT,
+    DEFAULT_MAX_UPDATE_INTERVAL,
+    DEFAULT_MIN_UPDATE_INTERVAL,
+    DISCOVERY_INTERVAL,
+    DOMAIN,
+    POLL_BACKOFF_FACTOR,
+    REQUEST_SPACING,
+)
+from .limiter import PRIORITY_POLL, PRIORITY_RECONCILE, RequestScheduler
+from .metrics import RuntimeMetrics
+from .model import Regulation, Thermostat, Zone
+from .retry import BaillconnectHTTPError, CircuitBreaker, CircuitOpenError, RetryPolicy
+from .schedule import ZoneSchedule
+from .session_manager import RegulationNotFoundError, SessionManager
+from .writer import WriteAggregator
+
+DISCOVERY_STORAGE_VERSION = 1
+CACHE_STORAGE_VERSION = 1
+# Écriture du dernier snapshot différée : une rafale de cycles ne donne qu'une écriture disque
+CACHE_SAVE_DELAY = 10
 
 _LOGGER = logging.getLogger(__name__)
 
+
+class BaillclimCoordinator(DataUpdateCoordinator):
+    """Coordinator BaillConnect avec un index des régulations, thermostats et zones.
+
+    `data` est un dict `{reg_id: Regulation}` (modèle décodé une fois par réponse).
+    L'index est reconstruit une seule fois par nouvel objet `data`, ce qui rend
+    les lectures des entités en O(1) au lieu de parcourir les listes imbriquées.
+    À chaque reconstruction, les enregistrements modifiés sont notés sous forme de
+    clés `("regulation", reg_id)`, `("thermostat", reg_id, id)` et `("zone", reg_id, id)`
+    pour que seules les entités concernées écrivent leur état.
+    Les mêmes clés forment la topologie : quand des enregistrements apparaissent ou
+    disparaissent, `(ajoutés, retirés)` est diffusé sur `topology_signal` pour que
+    les plateformes ajoutent ou retirent seulement les entités concernées. Un retrait
+    doit être vu sur deux polls consécutifs, et un snapshot vide n'en produit aucun.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        email: str,
+        password: str,
+        update_interval: timedelta,
+        timeout: int,
+        max_concurrent: int,
+        entry_id: str | None = None,
+        base_url: str = BASE_URL,
+        min_update_interval: timedelta = timedelta(seconds=DEFAULT_MIN_UPDATE_INTERVAL),
+        max_update_interval: timedelta = timedelta(seconds=DEFAULT_MAX_UPDATE_INTERVAL),
+    ):
+        # ⏳ L'intervalle des options sert de point de départ, borné par plancher/plafond
+        self._min_interval = min(min_update_interval, max_update_interval)
+        self._max_interval = max(min_update_interval, max_update_interval)
+        super().__init__(
+            hass,
+            _LOGGER,
+            name="baillclim_data",
+            update_interval=min(max(update_interval, self._min_interval), self._max_interval),
+        )
+        self.metrics = RuntimeMetrics()
+        self.session = SessionManager(
+            hass, email, password, timeout, entry_id=entry_id, base_url=base_url, metrics=self.metrics
+        )
+        # 🚦 Tout le trafic passe par l'ordonnanceur : commandes > réconciliation > polling
+        self.scheduler = RequestScheduler(max_concurrent, min_interval=REQUEST_SPACING, metrics=self.metrics)
+        self._indexed_data = None
+        self._regulations: dict[int, Regulation] = {}
+        self._thermostats: dict[tuple[int, int], Thermostat] = {}
+        self._zones: dict[tuple[int, int], Zone] = {}
+        self._changed: set | None = None
+        self._digest: str | None = None
+        self._topology: frozenset = frozenset()
+        self._missing: frozenset = frozenset()
+        self._polled_snapshot = False
+        self._topology_changes: tuple[set, set] | None = None
+        self.topology_signal = f"{DOMAIN}_topology_{entry_id or id(self)}"
+        self.last_update_time: datetime | None = None
+        self.retry = RetryPolicy(CircuitBreaker(), metrics=self.metrics)
+        self.writer = WriteAggregator(hass, self)
+        # 🔎 Régulations découvertes : cache persisté, relu seulement périodiquement ou sur 404
+        self._reg_ids: list[int] | None = None
+        self._discovered_at: datetime | None = None
+        self._discovery_store = _discovery_store(hass, entry_id) if entry_id else None
+        # ⚡ Dernier snapshot valide : servi au démarrage (marqué `stale`) avant la première lecture
+        self._cache_store = _cache_store(hass, entry_id) if entry_id else None
+        self._saved_data: dict[int, Regulation] | None = None
+        self.stale = False
+
+    # ------------------ Index ------------------
+
+    def _ensure_index(self):
+        if self.data is self._indexed_data:
+            return
+        first_build = self._indexed_data is None
+        polled, self._polled_snapshot = self._polled_snapshot, False
+        regulations = dict(self.data or {})
+        thermostats = {}
+        zones = {}
+        changed = set()
+        for reg_id, reg in regulations.items():
+            previous = self._regulations.get(reg_id)
+            # Régulation identique (comparaison des dataclasses) : rien à comparer plus finement
+            unchanged = previous is not None and previous == reg
+
+            if not unchanged and (previous is None or previous.uc_mode != reg.uc_mode):
+                changed.add(("regulation", reg_id))
+            for th in reg.thermostats:
+                key = (reg_id, th.id)
+                thermostats[key] = th
+                if not unchanged and self._thermostats.get(key) != th:
+                    changed.add(("thermostat", *key))
+            for zone in reg.zones:
+                key = (reg_id, zone.id)
+                zones[key] = zone
+                if not unchanged and self._zones.get(key) != zone:
+                    changed.add(("zone", *key))
+
+        # Enregistrements disparus : leurs entités doivent aussi se mettre à jour
+        changed.update(("regulation", reg_id) for reg_id in self._regulations.keys() - regulations.keys())
+        changed.update(("thermostat", *key) for key in self._thermostats.keys() - thermostats.keys())
+        changed.update(("zone", *key) for key in self._zones.keys() - zones.keys())
+
+        # 🧩 Topologie : enregistrements apparus / disparus depuis le dernier index
+        topology = frozenset(
+            [("regulation", reg_id) for reg_id in regulations]
+            + [("thermostat", *key) for key in thermostats]
+            + [("zone", *key) for key in zones]
+        )
+        if first_build:
+            self._topology = topology
+        elif topology:
+            added = topology - self._topology
+            removed = set()
+            if polled:
+                # Un retrait n'est publié qu'après deux polls consécutifs sans l'enregistrement ;
+                # écritures et relectures de réconciliation n'avancent pas ce décompte
+                missing = self._topology - topology
+                removed = missing & self._missing
+                self._missing = missing - removed
+            if added or removed:
+                self._topology = (self._topology | added) - removed
+                pending_added, pending_removed = self._topology_changes or (set(), set())
+                self._topology_changes = (
+                    (pending_added - removed) | added,
+                    (pending_removed - added) | removed,
+                )
+        # Snapshot vide (session expirée…) : rien n'est retiré
+
+        self._regulations = regulations
+        self._thermostats = thermostats
+        self._zones = zones
+        self._changed = None if first_build else changed
+        self._digest = None
+        self._indexed_data = self.data
+
+    @callback
+    def async_update_listeners(self) -> None:
+        if self.last_update_success:
+            self.last_update_time = dt_util.utcnow()
+        self._ensure_index()
+        super().async_update_listeners()
+        # Les changements ont été consommés par les entités
+        self._changed = set()
+
+        # ⚡ Tout nouvel état confirmé (poll, écriture, réconciliation) est persisté
+        if not self.stale and self.data and self.data != self._saved_data:
+            self._saved_data = self.data
+            self._async_save_cache(self.data)
+
+        if self._topology_changes is not None:
+            added, removed = self._topology_changes
+            self._topology_changes = None
+            _LOGGER.info("🧩 Topologie modifiée : %s ajout(s), %s retrait(s)", len(added), len(removed))
+            async_dispatcher_send(self.hass, self.topology_signal, added, removed)
+
+    @property
+    def topology(self) -> frozenset:
+        """Clés `("regulation", reg_id)`, `("thermostat", reg_id, id)` et `("zone", reg_id, id)` connues."""
+        self._ensure_index()
+        return self._topology
+
+    def has_changed(self, *keys) -> bool:
+        """True si l'un des enregistrements `keys` a changé lors de la dernière mise à jour."""
+        self._ensure_index()
+        if self._changed is None or not keys:
+            return True
+        return any(key in self._changed for key in keys)
+
+    def get_regulation(self, reg_id: int) -> Regulation | None:
+        self._ensure_index()
+        return self._regulations.get(reg_id)
+
+    def get_thermostat(self, reg_id: int, thermostat_id: int) -> Thermostat | None:
+        self._ensure_index()
+        return self._thermostats.get((reg_id, thermostat_id))
+
+    def get_zone(self, reg_id: int, zone_id: int) -> Zone | None:
+        self._ensure_index()
+        return self._zones.get((reg_id, zone_id))
+
+    def get_zone_schedule(self, reg_id: int, zone_id: int) -> ZoneSchedule | None:
+        """Planning 7×24 de la zone (décodé une seule fois, à la lecture de la réponse)."""
+        zone = self.get_zone(reg_id, zone_id)
+        return zone.schedule if zone else None
+
+    def snapshot_summary(self) -> dict:
+        """Résumé compact du snapshot (pour le capteur de debug et les diagnostics)."""
+        self._ensure_index()
+        regulations = [self._regulations[reg_id] for reg_id in sorted(self._regulations)]
+        if self._digest is None:
+            # blake2b et non hash() (salé par processus) : comparable d'un redémarrage à l'autre
+            digest = hashlib.blake2b(digest_size=16)
+            for reg in regulations:
+                digest.update(json_bytes({**reg.as_dict(), "size": None}))
+            self._digest = digest.hexdigest()
+        return {
+            "last_update": self.last_update_time.isoformat() if self.last_update_time else None,
+            "payload_size": sum(reg.size for reg in regulations),
+            "regulation_count": len(regulations),
+            "hash": self._digest,
+            "stale": self.stale,
+        }
+
+    # ------------------ Lecture BaillConnect ------------------
+
+    async def _async_update_data(self):
+        with self.metrics.timer(self.metrics.poll_cycle.observe):
+            data = await self._async_poll()
+        self.stale = False
+        # Le prochain index est celui d'un poll complet (seul à pouvoir confirmer un retrait)
+        self._polled_snapshot = True
+        return data
+
+    async def _async_poll(self):
+        try:
+            # ✅ Initialisation complète via méthode async (corrige bug session non initialisée)
+            await self.retry.async_call(self.session.async_initialize, description="connexion", probe=False)
+
+            # 🔁 Liste des régulations : cache, sauf redécouverte due
+            reg_ids = await self._async_regulation_ids()
+        except CircuitOpenError as e:
+            raise UpdateFailed(str(e)) from e
+        except Exception as e:
+            raise UpdateFailed(f"❌ Impossible de récupérer la liste des régulations : {e}") from e
+
+        # 🔄 Parcours des régulations en parallèle (borné par le limiteur)
+        results = await asyncio.gather(*(self._async_fetch_regulation(reg_id) for reg_id in reg_ids))
+
+        if reg_ids and all(reg is None for reg in results):
+            raise UpdateFailed("❌ Aucune régulation n'a pu être lue")
+
+        # Une régulation en échec garde sa dernière valeur connue plutôt que de disparaître
+        previous = self.data or {}
+        data = {
+            reg_id: reg if reg is not None else previous[reg_id]
+            for reg_id, reg in zip(reg_ids, results)
+            if reg is not None or reg_id in previous
+        }
+
+        # Activité = changement de commande (modes, consignes, plannings), pas une dérive de température
+        self._adapt_interval(changed=_controls(data) != _controls(previous))
+        return data
+
+    # ------------------ Découverte des régulations ------------------
+
+    async def _async_regulation_ids(self) -> list[int]:
+        if self._reg_ids is None:
+            await self._async_load_discovery()
+
+        if self._reg_ids is None or self._discovered_at is None or (
+            dt_util.utcnow() - self._discovered_at > timedelta(seconds=DISCOVERY_INTERVAL)
+        ):
+            reg_ids = await self.retry.async_call(
+                self._async_list_regulations_once, description="liste des régulations"
+            )
+            if not reg_ids:
+                # Session expirée : la liste redirige vers la connexion (HTTP 200 sans aucun ID)
+                _LOGGER.warning("🔎 Liste des régulations vide, vérification de la session")
+                await self.session.async_refresh_cookie()
+                reg_ids = await self.retry.async_call(
+                    self._async_list_regulations_once, description="liste des régulations"
+                )
+            if not reg_ids and self._reg_ids:
+                # Jamais de liste vide à la place d'une découverte valide (ni en mémoire ni sur disque)
+                raise Exception(f"liste vide, régulations connues conservées : {self._reg_ids}")
+            if reg_ids != self._reg_ids:
+                _LOGGER.info("🔎 Régulations découvertes : %s", reg_ids)
+            self._reg_ids = reg_ids
+            self._discovered_at = dt_util.utcnow()
+            await self._async_save_discovery()
+
+        return self._reg_ids
+
+    async def _async_list_regulations_once(self) -> list[int]:
+        async with self.scheduler.slot(None, PRIORITY_POLL):
+            return await self.session.async_get_regulation_ids()
+
+    async def _async_load_discovery(self):
+        if self._discovery_store is None:
+            return
+        stored = await self._discovery_store.async_load()
+        if not stored or not isinstance(stored.get("regulation_ids"), list):
+            return
+        self._reg_ids = [int(reg_id) for reg_id in stored["regulation_ids"]]
+        self._discovered_at = dt_util.parse_datetime(stored.get("discovered_at") or "")
+        _LOGGER.debug("🔎 Régulations restaurées : %s (découvertes le %s)", self._reg_ids, self._discovered_at)
+
+    async def _async_save_discovery(self):
+        if self._discovery_store is None:
+            return
+        await self._discovery_store.async_save({
+            "discovered_at": self._discovered_at.isoformat(),
+            "regulation_ids": self._reg_ids,
+        })
+
+    # ------------------ Dernier snapshot connu ------------------
+
+    async def async_load_cached_data(self) -> bool:
+        """Charge le dernier snapshot persisté dans `data` (marqué `stale`) ; False s'il n'y en a pas."""
+        if self._cache_store is None:
+            return False
+        stored = await self._cache_store.async_load()
+        try:
+            data = {int(reg_id): Regulation.from_dict(reg) for reg_id, reg in (stored or {}).items()}
+        except (KeyError, TypeError, ValueError) as e:
+            _LOGGER.warning("⚠️ Snapshot persisté illisible, ignoré : %s", e)
+            return False
+        if not data:
+            return False
+        self.data = data
+        self._saved_data = data
+        self.stale = True
+        _LOGGER.debug("⚡ Snapshot restauré : %s régulation(s)", len(data))
+        return True
+
+    @callback
+    def _async_save_cache(self, data: dict[int, Regulation]):
+        if self._cache_store is None:
+            return
+        self._cache_store.async_delay_save(
+            lambda: {str(reg_id): reg.as_dict() for reg_id, reg in data.items()}, CACHE_SAVE_DELAY
+        )
+
+    async def async_rediscover(self):
+        """Relit la liste des régulations du compte au prochain cycle, lancé immédiatement."""
+        self._discovered_at = None
+        await self.async_refresh()
+
+    # ------------------ Polling adaptatif ------------------
+
+    def _adapt_interval(self, changed: bool):
+        """Plancher dès qu'un changement est vu, sinon recul géométrique jusqu'au plafond."""
+        if changed:
+            interval = self._min_interval
+        else:
+            interval = min(self.update_interval * POLL_BACKOFF_FACTOR, self._max_interval)
+
+        if interval != self.update_interval:
+            _LOGGER.debug("⏳ Intervalle de polling : %s → %s", self.update_interval, interval)
+            self.update_interval = interval
+
+    @callback
+    def async_note_activity(self):
+        """Une commande vient d'être envoyée : repasse au polling rapide."""
+        self._adapt_interval(changed=True)
+
+    async def _async_fetch_regulation(self, reg_id: int, priority: int = PRIORITY_POLL) -> Regulation | None:
+        try:
+            return await self.retry.async_call(
+                self._async_fetch_regulation_once, reg_id, priority, description=f"lecture régulation {reg_id}"
+            )
+        except Exception as e:
+            _LOGGER.warning("⚠️ Erreur régulation %s : %s", reg_id, e)
+            return None
+
+    async def _async_fetch_regulation_once(self, reg_id: int, priority: int) -> Regulation | None:
+        # Réessais hors de la file : un backoff ne bloque pas les commandes
+        async with self.scheduler.slot(reg_id, priority):
+            with self.metrics.timer(lambda ms: self.metrics.observe_fetch(reg_id, ms)):
+                try:
+                    status, response_data, size = await self.session.async_post_regulation(reg_id, {})
+                except RegulationNotFoundError:
+                    # Régulation retirée du compte : la liste sera relue au prochain cycle
+                    _LOGGER.warning("🔎 Régulation %s introuvable (404), redécouverte programmée", reg_id)
+                    self._discovered_at = None
+                    return None
+
+        if status != 200:
+            raise BaillconnectHTTPError(status, f"Réponse invalide (HTTP {status})")
+        regulation = Regulation.from_response(response_data, size) if response_data is not None else None
+        if regulation is None:
+            raise Exception(f"Réponse vide ou invalide (HTTP {status})")
+        return regulation
+
+    async def async_refresh_regulation(self, reg_id: int):
+        """Relecture de réconciliation d'une seule régulation (au lieu d'un cycle complet)."""
+        try:
+            await self.retry.async_call(self.session.async_initialize, description="connexion", probe=False)
+        except Exception as e:
+            _LOGGER.warning("⚠️ Relecture régulation %s impossible : %s", reg_id, e)
+            return
+        reg = await self._async_fetch_regulation(reg_id, PRIORITY_RECONCILE)
+        if reg is not None:
+            self.async_set_updated_data(self._with_regulation(reg))
+
+    # ------------------ Mise à jour locale après écriture ------------------
+
+    @callback
+    def async_apply_write(self, reg_id: int, payload: dict, regulation: Regulation | None = None) -> bool:
+        """Publie immédiatement l'état après une écriture réussie.
+
+        Si le POST a renvoyé la régulation complète, elle remplace directement
+        l'entrée en cache (retourne True). Sinon les clés envoyées sont appliquées
+        de façon optimiste (retourne False : une relecture reste nécessaire).
+        """
+        if regulation is not None and regulation.id == reg_id:
+            self.async_set_updated_data(self._with_regulation(regulation))
+            return True
+
+        current = (self.data or {}).get(reg_id)
+        if current is not None:
+            self.async_set_updated_data(self._with_regulation(current.patched(payload)))
+        return False
+
+    def _with_regulation(self, regulation: Regulation) -> dict[int, Regulation]:
+        """Nouvel objet `data` où seule la régulation `regulation.id` est remplacée."""
+        return {**(self.data or {}), regulation.id: regulation}
+
+
+def _controls(data: dict[int, Regulation]) -> dict[int, tuple]:
+    return {reg_id: reg.controls() for reg_id, reg in data.items()}
+
+
+def _discovery_store(hass: HomeAssistant, entry_id: str) -> Store:
+    return Store(hass, DISCOVERY_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.regulations")
+
+
+async def async_remove_discovery_store(hass: HomeAssistant, entry_id: str):
+    """Supprime la liste des régulations persistée d'une entrée."""
+    await _discovery_store(hass, entry_id).async_remove()
+
+
+def _cache_store(hass: HomeAssistant, entry_id: str) -> Store:
+    return Store(hass, CACHE_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.snapshot")
+
+
+async def async_remove_cache_store(hass: HomeAssistant, entry_id: str):
+    """Supprime le dernier snapshot persisté d'une entrée."""
+    await _cache_store(hass, entry_id).async_remove()
+
+
 def create_baillclim_coordinator(
     hass: HomeAssistant,
     email: str,
     password: str,
     update_interval: timedelta = timedelta(seconds=60),
-    timeout: int = 25
+    timeout: int = 25,
+    max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+    entry_id: str | None = None,
+    base_url: str = BASE_URL,
+    min_update_interval: timedelta = timedelta(seconds=DEFAULT_MIN_UPDATE_INTERVAL),
+    max_update_interval: timedelta = timedelta(seconds=DEFAULT_MAX_UPDATE_INTERVAL),
 ):
-    async def async_update_data():
-        async def fetch_data():
-            # ✅ Initialisation complète via méthode async (corrige bug session non initialisée)
-            await SessionManager.async_initialize(hass, email, password, reg_id=0, timeout=timeout)
-            session = await SessionManager.async_get_session(hass)
-
-            regulations = []
-            MAX_RETRIES = 3
-
-            # 🔁 Récupération de la liste des régulations
-            for attempt in range(MAX_RETRIES):
-                try:
-                    reg_list_page = await hass.async_add_executor_job(
-                        lambda: session.get("https://www.baillconnect.com/client/regulations", timeout=timeout)
-                    )
-                    reg_ids = set(re.findall(r"/client/regulations/(\d+)", reg_list_page.text))
-                    break
-                except Exception as e:
-                    if attempt < MAX_RETRIES - 1:
-                        await hass.async_add_executor_job(time.sleep, 2)
-                        continue
-                    _LOGGER.warning("❌ Impossible de récupérer la liste des régulations : %s", e)
-                    return {"data": {"regulations": []}}
-
-            # 🔄 Parcours des régulations
-            for reg_id in reg_ids:
-                for attempt in range(MAX_RETRIES):
-                    try:
-                        await hass.async_add_executor_job(SessionManager._initialize_for_regulation, int(reg_id))
-                        session = await SessionManager.async_get_session(hass)
-                        url = f"https://www.baillconnect.com/api-client/regulations/{reg_id}"
-
-                        response = await hass.async_add_executor_job(
-                            lambda: session.post(url=url, json={}, timeout=timeout)
-                        )
-
-                        if response.status_code != 200 or not response.content:
-                            _LOGGER.warning("🔄 Session possiblement expirée, tentative de reconnexion")
-                            await hass.async_add_executor_job(SessionManager._refresh_cookie)
-                            session = await SessionManager.async_get_session(hass)
-                            response = await hass.async_add_executor_job(
-                                lambda: session.post(url=url, json={}, timeout=timeout)
-                            )
-
-                        # ✅ CORRECTION : on encapsule le data dans "data"
-                        response_data = response.json()
-                        regulations.append({
-                            "id": int(reg_id),
-                            "data": response_data
-                        })
-                        break
-
-                    except Exception as e:
-                        if attempt < MAX_RETRIES - 1:
-                            await hass.async_add_executor_job(time.sleep, 2)
-                            continue
-                        _LOGGER.warning("⚠️ Erreur régulation %s : %s", reg_id, e)
-
-                # 💤 Anti-flood
-                await hass.async_add_executor_job(time.sleep, 1)
-
-            return {"data": {"regulations": regulations}}
-
-        return await fetch_data()
-
-    return DataUpdateCoordinator(
+    return BaillclimCoordinator(
         hass,
-        _LOGGER,
-        name="baillclim_data",
-        update_method=async_update_data,
+        email=email,
+        password=password,
         update_interval=update_interval,
+        timeout=timeout,
+        max_concurrent=max_concurrent,
+        entry_id=entry_id,
+        base_url=base_url,
+        min_update_interval=min_update_interval,
+        max_update_interval=max_update_interval,
     )
@@ -0,0 +1,38 @@
+from homeassistant.components.diagnostics import REDACTED, async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+# Noms de thermostats/zones (souvent des pièces ou des personnes) compris
+TO_REDACT = {"email", "password", "_token", "serial", "serial_number", "mac", "mac_address", "name"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Snapshot BaillConnect décodé, généré uniquement à la demande (et expurgé)."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    data = coordinator.data or {}
+    metrics = coordinator.metrics.as_dict()
+
+    # Identifiants de régulation remplacés par des alias stables dans tout le dump
+    reg_ids = sorted(set(data) | {int(reg_id) for reg_id in metrics["fetch_latency"]})
+    aliases = {reg_id: f"regulation_{index}" for index, reg_id in enumerate(reg_ids, 1)}
+    metrics["fetch_latency"] = {
+        aliases[int(reg_id)]: histogram for reg_id, histogram in metrics["fetch_latency"].items()
+    }
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": str(coordinator.update_interval),
+            "summary": coordinator.snapshot_summary(),
+            "metrics": metrics,
+        },
+        "data": async_redact_data(
+            {aliases[reg_id]: {**reg.as_dict(), "id": REDACTED} for reg_id, reg in data.items()}, TO_REDACT
+        ),
+    }
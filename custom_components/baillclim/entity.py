@@ -0,0 +1,92 @@
+from collections.abc import Callable, Iterable
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+
+@callback
+def async_setup_topology(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator,
+    async_add_entities: AddEntitiesCallback,
+    factory: Callable[[tuple], Iterable[Entity]],
+):
+    """Crée les entités de la topologie actuelle, puis celles des enregistrements qui apparaissent.
+
+    `factory(clé)` retourne les entités de la plateforme pour une clé de topologie
+    (rien si la clé ne la concerne pas). Les retraits sont gérés par les entités elles-mêmes.
+    """
+
+    @callback
+    def _async_add(keys):
+        entities = [entity for key in sorted(keys) for entity in factory(key)]
+        if entities:
+            # Pas de update_before_add : il déclencherait une lecture BaillConnect pendant le setup
+            async_add_entities(entities)
+
+    @callback
+    def _async_topology_changed(added: set, removed: set):
+        _async_add(added)
+
+    _async_add(coordinator.topology)
+    entry.async_on_unload(async_dispatcher_connect(hass, coordinator.topology_signal, _async_topology_changed))
+
+
+class BaillclimEntity(CoordinatorEntity):
+    """Entité BaillClim qui n'écrit son état que si ses propres données ont changé.
+
+    `_change_keys` liste les enregistrements suivis, par ex. `("thermostat", reg_id, id)` ;
+    vide = toujours mettre à jour.
+    `_topology_key` est l'enregistrement dont dépend l'entité : s'il disparaît de
+    BaillConnect, l'entité est retirée sans recharger l'entrée.
+    Tant que l'état vient du snapshot persisté (avant la première lecture), l'attribut
+    `stale` vaut True.
+    """
+
+    _change_keys: tuple = ()
+    _topology_key: tuple | None = None
+    _last_available: bool | None = None
+    _last_stale: bool | None = None
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        if self._topology_key is not None:
+            self.async_on_remove(
+                async_dispatcher_connect(self.hass, self.coordinator.topology_signal, self._handle_topology_change)
+            )
+
+    @callback
+    def _handle_topology_change(self, added: set, removed: set) -> None:
+        if self._topology_key in removed:
+            self.hass.async_create_task(self._async_retire())
+
+    async def _async_retire(self):
+        registry = er.async_get(self.hass)
+        if self.registry_entry is not None and registry.async_get(self.entity_id):
+            # Retrait du registre : supprime aussi l'entité de HA
+            registry.async_remove(self.entity_id)
+        else:
+            await self.async_remove(force_remove=True)
+
+    @property
+    def extra_state_attributes(self):
+        return {"stale": True} if self.coordinator.stale else None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        available = self.coordinator.last_update_success
+        stale = self.coordinator.stale
+        if (
+            available != self._last_available
+            or stale != self._last_stale
+            or self.coordinator.has_changed(*self._change_keys)
+        ):
+            self._last_available = available
+            self._last_stale = stale
+            super()._handle_coordinator_update()
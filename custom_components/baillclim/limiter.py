@@ -0,0 +1,106 @@
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from typing import Hashable
+
+from .metrics import RuntimeMetrics
+
+# Priorités (plus petit = servi d'abord)
+PRIORITY_WRITE = 0
+PRIORITY_RECONCILE = 1
+PRIORITY_POLL = 2
+
+PRIORITY_NAMES = {PRIORITY_WRITE: "write", PRIORITY_RECONCILE: "reconcile", PRIORITY_POLL: "poll"}
+
+
+class RequestScheduler:
+    """Ordonnanceur unique de tout le trafic BaillConnect d'une entrée.
+
+    Chaque régulation a sa file (une seule requête en vol par régulation, dans
+    l'ordre des priorités) ; entre les files, la requête de plus haute priorité
+    puis la plus ancienne passe d'abord :
+    commandes interactives > relectures de réconciliation > polling.
+
+    Au plus `max_concurrent` requêtes en vol, dont `max_concurrent - 1` pour le
+    polling : une place reste libre pour une commande même en plein cycle.
+    Les démarrages hors commandes sont espacés d'au moins `min_interval` secondes
+    (remplace l'ancien `time.sleep(1)` "anti-flood").
+    """
+
+    def __init__(self, max_concurrent: int, min_interval: float = 0.0, metrics: RuntimeMetrics | None = None):
+        self._max_concurrent = max(1, max_concurrent)
+        self._background_limit = max(1, self._max_concurrent - 1)
+        self._min_interval = min_interval
+        self._metrics = metrics or RuntimeMetrics()
+        self._next_start = 0.0
+        self._active = 0
+        self._active_background = 0
+        self._busy: set[Hashable] = set()
+        self._queues: dict[Hashable, list] = {}
+        self._seq = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, reg_id: Hashable, priority: int = PRIORITY_POLL):
+        """`async with scheduler.slot(reg_id, priorité):` — attend son tour puis occupe une place."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queued_at = loop.time()
+        heapq.heappush(self._queues.setdefault(reg_id, []), (priority, next(self._seq), future))
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Annulé après avoir obtenu sa place : la rendre
+            if future.done() and not future.cancelled():
+                self._release(reg_id, priority)
+            raise
+
+        try:
+            if self._min_interval and priority != PRIORITY_WRITE:
+                now = loop.time()
+                start = max(now, self._next_start)
+                self._next_start = start + self._min_interval
+                if start > now:
+                    await asyncio.sleep(start - now)
+            self._metrics.observe_queue_wait(PRIORITY_NAMES.get(priority, str(priority)),
+                                             (loop.time() - queued_at) * 1000)
+            yield
+        finally:
+            self._release(reg_id, priority)
+
+    def _dispatch(self):
+        while self._active < self._max_concurrent:
+            best = None
+            for reg_id, queue in self._queues.items():
+                # Attentes annulées retirées paresseusement
+                while queue and queue[0][2].cancelled():
+                    heapq.heappop(queue)
+                if not queue or reg_id in self._busy:
+                    continue
+                priority, seq, _ = queue[0]
+                if priority == PRIORITY_POLL and self._active_background >= self._background_limit:
+                    continue
+                if best is None or (priority, seq) < best[0]:
+                    best = ((priority, seq), reg_id)
+
+            for reg_id in [reg_id for reg_id, queue in self._queues.items() if not queue]:
+                del self._queues[reg_id]
+            if best is None:
+                return
+
+            reg_id = best[1]
+            priority, _, future = heapq.heappop(self._queues[reg_id])
+            self._busy.add(reg_id)
+            self._active += 1
+            if priority == PRIORITY_POLL:
+                self._active_background += 1
+            future.set_result(None)
+
+    def _release(self, reg_id: Hashable, priority: int):
+        self._busy.discard(reg_id)
+        self._active -= 1
+        if priority == PRIORITY_POLL:
+            self._active_background -= 1
+        self._dispatch()
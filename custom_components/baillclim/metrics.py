@@ -0,0 +1,102 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Bornes supérieures des seaux d'histogramme, en millisecondes
+BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """Histogramme de durées à seaux fixes (mémoire constante)."""
+
+    __slots__ = ("count", "total", "min", "max", "last", "_buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+        self.last: float | None = None
+        self._buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def observe(self, ms: float):
+        self.count += 1
+        self.total += ms
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = ms if self.max is None else max(self.max, ms)
+        self.last = ms
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self._buckets[i] += 1
+                break
+        else:
+            self._buckets[-1] += 1
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> dict:
+        labels = [f"≤{bound}" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+        return {
+            "count": self.count,
+            "mean_ms": None if self.mean is None else round(self.mean, 1),
+            "min_ms": None if self.min is None else round(self.min, 1),
+            "max_ms": None if self.max is None else round(self.max, 1),
+            "last_ms": None if self.last is None else round(self.last, 1),
+            "buckets_ms": dict(zip(labels, self._buckets)),
+        }
+
+
+class RuntimeMetrics:
+    """Compteurs et histogrammes d'une entrée : partagés par la session, le coordinator et les réessais.
+
+    Compteurs : `requests` par "endpoint HTTP statut" et `events` (login, scrape CSRF, réessai…).
+    Histogrammes : durée des cycles de polling, latence de lecture par régulation et
+    attente dans l'ordonnanceur par priorité.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.requests = Counter()
+        self.events = Counter()
+        self.poll_cycle = Histogram()
+        self.fetch_latency: dict[int, Histogram] = {}
+        self.queue_wait: dict[str, Histogram] = {}
+
+    def record_request(self, endpoint: str, status: int | str):
+        self.requests[f"{endpoint} {status}"] += 1
+
+    def record_event(self, name: str):
+        self.events[name] += 1
+
+    def observe_fetch(self, reg_id: int, ms: float):
+        histogram = self.fetch_latency.get(reg_id)
+        if histogram is None:
+            histogram = self.fetch_latency[reg_id] = Histogram()
+        histogram.observe(ms)
+
+    def observe_queue_wait(self, priority: str, ms: float):
+        histogram = self.queue_wait.get(priority)
+        if histogram is None:
+            histogram = self.queue_wait[priority] = Histogram()
+        histogram.observe(ms)
+
+    @contextmanager
+    def timer(self, observe):
+        """`with metrics.timer(histogram.observe):` — mesure la durée du bloc en ms."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            observe((time.perf_counter() - start) * 1000)
+
+    def as_dict(self) -> dict:
+        return {
+            "uptime_s": round(time.time() - self.started_at),
+            "requests": dict(sorted(self.requests.items())),
+            "events": dict(sorted(self.events.items())),
+            "poll_cycle": self.poll_cycle.as_dict(),
+            "fetch_latency": {str(reg_id): h.as_dict() for reg_id, h in sorted(self.fetch_latency.items())},
+            "queue_wait": {priority: h.as_dict() for priority, h in sorted(self.queue_wait.items())},
+        }
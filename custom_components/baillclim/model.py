@@ -0,0 +1,214 @@
+from dataclasses import asdict, dataclass, field, fields, replace
+
+from .schedule import HOURS, ZoneSchedule
+
+
+@dataclass(slots=True, frozen=True)
+class Thermostat:
+    id: int
+    name: str
+    is_on: bool
+    t1_t2: int | None
+    setpoint_hot_t1: float | None
+    setpoint_hot_t2: float | None
+    setpoint_cool_t1: float | None
+    setpoint_cool_t2: float | None
+    temperature: float | None
+    is_battery_low: bool
+
+    @classmethod
+    def from_api(cls, data: dict) -> "Thermostat":
+        return cls(
+            id=data["id"],
+            name=(data.get("name") or f"Thermostat {data['id']}").strip(),
+            is_on=bool(data.get("is_on")),
+            t1_t2=data.get("t1_t2"),
+            setpoint_hot_t1=data.get("setpoint_hot_t1"),
+            setpoint_hot_t2=data.get("setpoint_hot_t2"),
+            setpoint_cool_t1=data.get("setpoint_cool_t1"),
+            setpoint_cool_t2=data.get("setpoint_cool_t2"),
+            temperature=data.get("temperature"),
+            is_battery_low=bool(data.get("is_battery_low", False)),
+        )
+
+    def patched(self, values: dict) -> "Thermostat":
+        """Copie avec les champs API `values` appliqués (les champs non modélisés sont ignorés)."""
+        changes = {key: value for key, value in values.items() if key in _THERMOSTAT_FIELDS}
+        return replace(self, **changes) if changes else self
+
+
+@dataclass(slots=True, frozen=True)
+class Zone:
+    id: int
+    name: str
+    mode: int | None
+    schedule: ZoneSchedule
+
+    @classmethod
+    def from_api(cls, data: dict) -> "Zone":
+        return cls(
+            id=data["id"],
+            name=(data.get("name") or f"Zone {data['id']}").strip(),
+            mode=data.get("mode"),
+            schedule=ZoneSchedule.from_zone(data),
+        )
+
+    def patched(self, values: dict) -> "Zone":
+        """Copie avec `mode` et les créneaux `schedule_{j}_{h}` de `values` appliqués."""
+        slots = {}
+        for key, value in values.items():
+            if key.startswith("schedule_"):
+                try:
+                    day, hour = (int(part) for part in key[len("schedule_"):].split("_"))
+                except ValueError:
+                    continue
+                slots[day * HOURS + hour] = value
+        changes = {"mode": values["mode"]} if "mode" in values else {}
+        if slots:
+            changes["schedule"] = self.schedule.with_slots(slots)
+        return replace(self, **changes) if changes else self
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Zone":
+        """Inverse de `as_dict`."""
+        return cls(
+            id=data["id"],
+            name=data["name"],
+            mode=data.get("mode"),
+            schedule=ZoneSchedule.from_packed(data["schedule"]),
+        )
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "name": self.name, "mode": self.mode, "schedule": self.schedule.packed()}
+
+
+@dataclass(slots=True, frozen=True)
+class Regulation:
+    """Régulation décodée une seule fois depuis la réponse API ; seuls les champs utilisés sont gardés."""
+
+    id: int
+    uc_mode: int | None
+    thermostats: tuple[Thermostat, ...]
+    zones: tuple[Zone, ...]
+    # Taille de la réponse JSON (octets), hors comparaison
+    size: int = field(default=0, compare=False)
+
+    @classmethod
+    def from_api(cls, data: dict, size: int = 0) -> "Regulation":
+        """`data` = objet `data` de la réponse `/api-client/regulations/{id}`."""
+        return cls(
+            id=data["id"],
+            uc_mode=data.get("uc_mode"),
+            thermostats=tuple(Thermostat.from_api(th) for th in data.get("thermostats", []) if "id" in th),
+            zones=tuple(Zone.from_api(zone) for zone in data.get("zones", []) if "id" in zone),
+            size=size,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Regulation":
+        """Inverse de `as_dict` (snapshot persisté)."""
+        return cls(
+            id=data["id"],
+            uc_mode=data.get("uc_mode"),
+            thermostats=tuple(
+                Thermostat(**{f.name: th.get(f.name) for f in fields(Thermostat)}) for th in data["thermostats"]
+            ),
+            zones=tuple(Zone.from_dict(zone) for zone in data["zones"]),
+            size=data.get("size", 0),
+        )
+
+    @classmethod
+    def from_response(cls, response: dict, size: int = 0) -> "Regulation | None":
+        """Régulation contenue dans une réponse API, ou None si la réponse n'en contient pas."""
+        data = response.get("data") if isinstance(response, dict) else None
+        if not isinstance(data, dict) or data.get("id") is None:
+            return None
+        return cls.from_api(data, size)
+
+    def patched(self, payload: dict) -> "Regulation":
+        """Copie avec les clés API (`uc_mode`, `thermostats.{id}.x`, `zones.{id}.x`) appliquées."""
+        changes = {}
+        records: dict[str, dict[int, dict]] = {"thermostats": {}, "zones": {}}
+        for key, value in payload.items():
+            parts = key.split(".")
+            if len(parts) == 1 and key == "uc_mode":
+                changes["uc_mode"] = value
+            elif len(parts) == 3 and parts[0] in records:
+                try:
+                    records[parts[0]].setdefault(int(parts[1]), {})[parts[2]] = value
+                except ValueError:
+                    continue
+
+        if records["thermostats"]:
+            changes["thermostats"] = tuple(
+                th.patched(records["thermostats"][th.id]) if th.id in records["thermostats"] else th
+                for th in self.thermostats
+            )
+        if records["zones"]:
+            changes["zones"] = tuple(
+                zone.patched(records["zones"][zone.id]) if zone.id in records["zones"] else zone
+                for zone in self.zones
+            )
+        return replace(self, **changes) if changes else self
+
+    def controls(self) -> tuple:
+        """État pilotable seul (sans température ni batterie) : base de la détection d'activité."""
+        return (
+            self.uc_mode,
+            tuple((th.id, *(getattr(th, key) for key in WRITABLE_THERMOSTAT_FIELDS)) for th in self.thermostats),
+            tuple((zone.id, zone.mode, zone.schedule) for zone in self.zones),
+        )
+
+    def writable_state(self) -> dict:
+        """État modifiable via l'API (uc_mode, thermostats, modes et plannings packés), sérialisable en JSON."""
+        return {
+            "uc_mode": self.uc_mode,
+            "thermostats": {
+                str(th.id): {key: getattr(th, key) for key in WRITABLE_THERMOSTAT_FIELDS} for th in self.thermostats
+            },
+            "zones": {
+                str(zone.id): {"mode": zone.mode, "schedule": zone.schedule.packed()} for zone in self.zones
+            },
+        }
+
+    def diff_payload(self, state: dict) -> dict:
+        """Clés API minimales pour ramener la régulation à `state` (issu de `writable_state`).
+
+        Les thermostats et zones qui n'existent plus sont ignorés, ainsi que les valeurs inconnues.
+        """
+        payload = {}
+        if state.get("uc_mode") is not None and state["uc_mode"] != self.uc_mode:
+            payload["uc_mode"] = state["uc_mode"]
+
+        thermostats = state.get("thermostats", {})
+        for th in self.thermostats:
+            saved = thermostats.get(str(th.id), {})
+            for key in WRITABLE_THERMOSTAT_FIELDS:
+                if saved.get(key) is not None and saved[key] != getattr(th, key):
+                    payload[f"thermostats.{th.id}.{key}"] = saved[key]
+
+        zones = state.get("zones", {})
+        for zone in self.zones:
+            saved = zones.get(str(zone.id))
+            if not saved:
+                continue
+            if saved.get("mode") is not None and saved["mode"] != zone.mode:
+                payload[f"zones.{zone.id}.mode"] = saved["mode"]
+            if saved.get("schedule"):
+                payload.update(zone.schedule.diff_payload(zone.id, ZoneSchedule.from_packed(saved["schedule"])))
+        return payload
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "uc_mode": self.uc_mode,
+            "thermostats": [asdict(th) for th in self.thermostats],
+            "zones": [zone.as_dict() for zone in self.zones],
+            "size": self.size,
+        }
+
+
+_THERMOSTAT_FIELDS = frozenset(f.name for f in fields(Thermostat)) - {"id"}
+
+# Champs de thermostat modifiables via l'API
+WRITABLE_THERMOSTAT_FIELDS = ("is_on", "t1_t2", "setpoint_hot_t1", "setpoint_hot_t2", "setpoint_cool_t1", "setpoint_cool_t2")
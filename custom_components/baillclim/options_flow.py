@@ -1,6 +1,11 @@
 import voluptuous as vol
 from homeassistant import config_entries
-from .const import DOMAIN
+from .const import (
+    DEFAULT_MAX_CONCURRENT,
+    DEFAULT_MAX_UPDATE_INTERVAL,
+    DEFAULT_MIN_UPDATE_INTERVAL,
+    DOMAIN,
+)
 
 class BaillClimOptionsFlowHandler(config_entries.OptionsFlow):
     def __init__(self, config_entry):
@@ -17,5 +22,8 @@ class BaillClimOptionsFlowHandler(config_entries.OptionsFlow):
             data_schema=vol.Schema({
                 vol.Required("update_interval", default=self.config_entry.options.get("update_interval", 60)): vol.All(int, vol.Range(min=10, max=600)),
                 vol.Required("timeout", default=self.config_entry.options.get("timeout", 15)): vol.All(int, vol.Range(min=5, max=60)),
+                vol.Required("max_concurrent", default=self.config_entry.options.get("max_concurrent", DEFAULT_MAX_CONCURRENT)): vol.All(int, vol.Range(min=1, max=10)),
+                vol.Required("min_update_interval", default=self.config_entry.options.get("min_update_interval", DEFAULT_MIN_UPDATE_INTERVAL)): vol.All(int, vol.Range(min=10, max=600)),
+                vol.Required("max_update_interval", default=self.config_entry.options.get("max_update_interval", DEFAULT_MAX_UPDATE_INTERVAL)): vol.All(int, vol.Range(min=10, max=3600)),
             }),
         )
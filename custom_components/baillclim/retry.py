@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import random
+import time
+
+import aiohttp
+
+from .const import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    RETRY_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+)
+from .metrics import RuntimeMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """BaillConnect est considéré hors service : l'appel n'est pas tenté."""
+
+
+class BaillconnectHTTPError(Exception):
+    """Réponse BaillConnect avec un statut HTTP inattendu."""
+
+    def __init__(self, status: int, message: str | None = None):
+        super().__init__(message or f"HTTP {status}")
+        self.status = status
+
+
+def _error_status(error: Exception) -> int | None:
+    if isinstance(error, (BaillconnectHTTPError, aiohttp.ClientResponseError)):
+        return error.status
+    return None
+
+
+def is_client_error(error: Exception) -> bool:
+    """Requête refusée (4xx) : la rejouer donnerait le même résultat."""
+    status = _error_status(error)
+    return status is not None and 400 <= status < 500
+
+
+def is_outage(error: Exception) -> bool:
+    """Panne côté service : erreur de transport, délai dépassé ou 5xx."""
+    status = _error_status(error)
+    if status is not None:
+        return status >= 500
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    """Disjoncteur : s'ouvre après N échecs consécutifs, laisse passer une sonde après `reset_timeout`.
+
+    fermé → ouvert (échecs) → semi-ouvert (une seule sonde) → fermé (succès) ou ouvert (échec)
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self._opened_at >= self._reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            _LOGGER.debug("🔌 Disjoncteur semi-ouvert : envoi d'une requête sonde")
+            return True
+        return False
+
+    def record_success(self):
+        if self._opened_at is not None:
+            _LOGGER.info("✅ BaillConnect à nouveau joignable, disjoncteur refermé")
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def abort_probe(self):
+        """Sonde interrompue sans résultat (annulation) : la suivante pourra partir."""
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self._probing or (self._opened_at is None and self._failures >= self._failure_threshold):
+            if self._opened_at is None:
+                _LOGGER.warning("⛔ %s échecs consécutifs : BaillConnect considéré hors service", self._failures)
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+
+class RetryPolicy:
+    """Réessais asynchrones avec backoff exponentiel et jitter, derrière un disjoncteur partagé."""
+
+    def __init__(self, breaker: CircuitBreaker, attempts: int = RETRY_ATTEMPTS,
+                 base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY,
+                 metrics: RuntimeMetrics | None = None):
+        self.breaker = breaker
+        self.metrics = metrics or RuntimeMetrics()
+        self._attempts = attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+
+    def _delay(self, attempt: int) -> float:
+        # "Full jitter" : étale les réessais de plusieurs appels simultanés
+        return random.uniform(0, min(self._max_delay, self._base_delay * 2 ** attempt))
+
+    async def async_call(self, func, *args, description: str = "requête BaillConnect", probe: bool = True):
+        """Exécute `await func(*args)` ; lève CircuitOpenError sans appel si le service est hors service.
+
+        `probe=False` pour un appel qui peut ne faire aucune requête (connexion encore valide) :
+        il n'est jamais retenu comme sonde et son succès ne referme pas le disjoncteur.
+        """
+        for attempt in range(self._attempts):
+            if probe:
+                probing = self.breaker.state == "half_open"
+                allowed = self.breaker.allow_request()
+            else:
+                probing = False
+                allowed = self.breaker.state != "open"
+            if not allowed:
+                self.metrics.record_event("circuit_rejected")
+                raise CircuitOpenError(f"BaillConnect indisponible, {description} non tentée")
+            try:
+                result = await func(*args)
+            except Exception as e:
+                # Seules les pannes (transport, délai, 5xx) comptent pour le disjoncteur
+                if is_outage(e):
+                    self.breaker.record_failure()
+                elif probing:
+                    self.breaker.abort_probe()
+                if is_client_error(e) or attempt >= self._attempts - 1:
+                    raise
+                delay = self._delay(attempt)
+                self.metrics.record_event("retry")
+                _LOGGER.debug("🔁 %s échouée (%s), nouvel essai dans %.1f s", description, e, delay)
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Annulation : ni succès ni échec, mais la sonde est libérée
+                if probing:
+                    self.breaker.abort_probe()
+                raise
+            else:
+                if probe:
+                    self.breaker.record_success()
+                return result
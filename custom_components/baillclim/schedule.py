@@ -0,0 +1,92 @@
+DAYS = 7
+HOURS = 24
+SLOT_COUNT = DAYS * HOURS
+
+# Valeur absente de la réponse API (jamais envoyée)
+UNKNOWN = 0xFF
+
+
+class ZoneSchedule:
+    """Planning hebdomadaire d'une zone : 7 × 24 créneaux stockés dans 168 octets.
+
+    Le créneau (jour j, heure h) correspond à la clé API `zones.{id}.schedule_{j}_{h}`.
+    Représentation "packée" pour les services : 7 chaînes de 24 chiffres (`-` = inconnu).
+    """
+
+    __slots__ = ("_slots",)
+
+    def __init__(self, slots: bytes):
+        if len(slots) != SLOT_COUNT:
+            raise ValueError(f"Un planning contient {SLOT_COUNT} créneaux, pas {len(slots)}")
+        self._slots = bytes(slots)
+
+    @classmethod
+    def from_zone(cls, zone: dict) -> "ZoneSchedule":
+        slots = bytearray(SLOT_COUNT)
+        for j in range(DAYS):
+            for h in range(HOURS):
+                value = zone.get(f"schedule_{j}_{h}")
+                slots[j * HOURS + h] = value if isinstance(value, int) and 0 <= value < UNKNOWN else UNKNOWN
+        return cls(slots)
+
+    @classmethod
+    def filled(cls, value: int) -> "ZoneSchedule":
+        return cls(bytes([value]) * SLOT_COUNT)
+
+    @classmethod
+    def from_packed(cls, days: list[str]) -> "ZoneSchedule":
+        if len(days) != DAYS or any(len(day) != HOURS for day in days):
+            raise ValueError(f"Format attendu : {DAYS} chaînes de {HOURS} caractères")
+        slots = bytearray(SLOT_COUNT)
+        for j, day in enumerate(days):
+            for h, char in enumerate(day):
+                if char == "-":
+                    slots[j * HOURS + h] = UNKNOWN
+                elif char.isdigit():
+                    slots[j * HOURS + h] = int(char)
+                else:
+                    raise ValueError(f"Valeur de créneau invalide : {char!r}")
+        return cls(slots)
+
+    def get(self, day: int, hour: int) -> int | None:
+        value = self._slots[day * HOURS + hour]
+        return None if value == UNKNOWN else value
+
+    def with_slots(self, slots: dict[int, int]) -> "ZoneSchedule":
+        """Copie avec les créneaux `{index: valeur}` remplacés (index = jour × 24 + heure)."""
+        updated = bytearray(self._slots)
+        for index, value in slots.items():
+            if 0 <= index < SLOT_COUNT and isinstance(value, int) and 0 <= value < UNKNOWN:
+                updated[index] = value
+        return ZoneSchedule(updated)
+
+    def packed(self) -> list[str]:
+        return [
+            "".join("-" if v == UNKNOWN else str(v) for v in self._slots[j * HOURS:(j + 1) * HOURS])
+            for j in range(DAYS)
+        ]
+
+    def to_payload(self, zone_id: int) -> dict:
+        """Toutes les clés API connues du planning."""
+        return {
+            f"zones.{zone_id}.schedule_{i // HOURS}_{i % HOURS}": value
+            for i, value in enumerate(self._slots)
+            if value != UNKNOWN
+        }
+
+    def diff_payload(self, zone_id: int, target: "ZoneSchedule") -> dict:
+        """Clés API des seuls créneaux où `target` diffère de ce planning."""
+        return {
+            f"zones.{zone_id}.schedule_{i // HOURS}_{i % HOURS}": new
+            for i, (old, new) in enumerate(zip(self._slots, target._slots))
+            if new != old and new != UNKNOWN
+        }
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ZoneSchedule) and self._slots == other._slots
+
+    def __hash__(self) -> int:
+        return hash(self._slots)
+
+    def __repr__(self) -> str:
+        return f"ZoneSchedule({self.packed()!r})"
@@ -1,11 +1,13 @@
 import logging
-from homeassistant.helpers.entity import Entity
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import Entity, EntityCategory
 from homeassistant.helpers.update_coordinator import CoordinatorEntity, DataUpdateCoordinator
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import DOMAIN
+from .entity import BaillclimEntity, async_setup_topology
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -13,72 +15,78 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback):
     coordinator: DataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
 
-    if not coordinator.data:
+    if coordinator.data is None:
         _LOGGER.error("❌ Aucune donnée récupérée pour initialiser les capteurs.")
         return
 
-    data = coordinator.data.get("data", {})
-    if not isinstance(data, dict):
-        _LOGGER.warning("❌ Format de données inattendu dans le coordinator : %s", data)
-        return
-
-    entities = [DebugBaillclimSensor(coordinator)]
+    _async_migrate_debug_unique_id(hass, entry)
+    # 📊 Métriques propres à l'entrée : une seule entité chacune
+    async_add_entities([
+        DebugBaillclimSensor(coordinator, entry.entry_id),
+        PollCycleSensor(coordinator, entry.entry_id),
+        RequestCountSensor(coordinator, entry.entry_id),
+    ])
+
+    def _entities(key):
+        if key[0] == "thermostat":
+            _, reg_id, tid = key
+            name = coordinator.get_thermostat(reg_id, tid).name
+            return [
+                ThermostatTemperatureSensor(coordinator, reg_id, tid, name),
+                ThermostatBatteryLowSensor(coordinator, reg_id, tid, name),
+            ]
+        if key[0] == "regulation":
+            # 📊 Latence de lecture (catégorie diagnostic) sur chaque appareil régulation
+            return [FetchLatencySensor(coordinator, key[1])]
+        return []
+
+    async_setup_topology(hass, entry, coordinator, async_add_entities, _entities)
+
+
+def _async_migrate_debug_unique_id(hass: HomeAssistant, entry: ConfigEntry):
+    """Ancien unique_id global du capteur de debug → unique_id propre à l'entrée (multi-compte)."""
+    registry = er.async_get(hass)
+    entity_id = registry.async_get_entity_id("sensor", DOMAIN, "baillclim_debug_data")
+    if entity_id and registry.async_get(entity_id).config_entry_id == entry.entry_id:
+        registry.async_update_entity(entity_id, new_unique_id=f"baillclim_debug_data_{entry.entry_id}")
 
-    for reg in data.get("regulations", []):
-        reg_data = reg.get("data", {}).get("data", {})
-        reg_id = reg_data.get("id")
-        if reg_id is None:
-            continue
 
-        for th in reg_data.get("thermostats", []):
-            tid = th.get("id")
-            name = th.get("name", f"Thermostat {tid}" if tid else "Inconnu").strip()
-            if tid is not None:
-                entities.append(ThermostatTemperatureSensor(coordinator, reg_id, tid, name))
-                entities.append(ThermostatBatteryLowSensor(coordinator, reg_id, tid, name))
-
-    async_add_entities(entities)
+class DebugBaillclimSensor(CoordinatorEntity, Entity):
+    """Résumé compact des données ; le JSON complet est dans le téléchargement des diagnostics."""
 
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
 
-class DebugBaillclimSensor(CoordinatorEntity, Entity):
-    def __init__(self, coordinator):
+    def __init__(self, coordinator, entry_id: str):
         super().__init__(coordinator)
         self._attr_name = "Debug BaillConnect Data"
-        self._attr_unique_id = "baillclim_debug_data"
+        self._attr_unique_id = f"baillclim_debug_data_{entry_id}"
         self._attr_icon = "mdi:code-json"
 
     @property
     def state(self):
-        return "OK" if self.coordinator.data else "Indisponible"
+        return "OK" if self.coordinator.data is not None else "Indisponible"
 
     @property
     def extra_state_attributes(self):
-        return self.coordinator.data or {}
+        return self.coordinator.snapshot_summary()
 
 
-class ThermostatTemperatureSensor(CoordinatorEntity, Entity):
+class ThermostatTemperatureSensor(BaillclimEntity, Entity):
     def __init__(self, coordinator, reg_id, tid, name):
         super().__init__(coordinator)
         self._reg_id = reg_id
         self._tid = tid
         self._attr_name = f"Température {name}"
         self._attr_unique_id = f"baillclim_temp_{reg_id}_{tid}"
+        self._change_keys = (("thermostat", reg_id, tid),)
+        self._topology_key = ("thermostat", reg_id, tid)
         self._attr_unit_of_measurement = "°C"
         self._attr_icon = "mdi:thermometer"
 
     @property
     def state(self):
-        try:
-            data = self.coordinator.data.get("data", {})
-            for reg in data.get("regulations", []):
-                reg_data = reg.get("data", {}).get("data", {})
-                if reg_data.get("id") == self._reg_id:
-                    for th in reg_data.get("thermostats", []):
-                        if th.get("id") == self._tid:
-                            return th.get("temperature")
-        except Exception as e:
-            _LOGGER.warning("⚠️ Erreur récupération température (reg_id=%s, tid=%s) : %s", self._reg_id, self._tid, e)
-        return None
+        th = self.coordinator.get_thermostat(self._reg_id, self._tid)
+        return th.temperature if th else None
 
     @property
     def device_info(self):
@@ -91,7 +99,7 @@ class ThermostatTemperatureSensor(CoordinatorEntity, Entity):
         }
 
 
-class ThermostatBatteryLowSensor(CoordinatorEntity, Entity):
+class ThermostatBatteryLowSensor(BaillclimEntity, Entity):
     def __init__(self, coordinator, reg_id, tid, name):
         super().__init__(coordinator)
         self._reg_id = reg_id
@@ -99,23 +107,88 @@ class ThermostatBatteryLowSensor(CoordinatorEntity, Entity):
         self._name = name
         self._attr_name = f"Batterie faible {name}"
         self._attr_unique_id = f"baillclim_battery_low_{reg_id}_{tid}"
+        self._change_keys = (("thermostat", reg_id, tid),)
+        self._topology_key = ("thermostat", reg_id, tid)
         self._attr_icon = "mdi:battery-alert"
         self._attr_device_class = "battery"
 
     @property
     def state(self):
-        try:
-            data = self.coordinator.data.get("data", {})
-            for reg in data.get("regulations", []):
-                reg_data = reg.get("data", {}).get("data", {})
-                if reg_data.get("id") == self._reg_id:
-                    for th in reg_data.get("thermostats", []):
-                        if th.get("id") == self._tid:
-                            is_low = th.get("is_battery_low", False)
-                            return "Batterie à changer" if is_low else "Batterie OK"
-        except Exception as e:
-            _LOGGER.warning("⚠️ Erreur récupération batterie (reg_id=%s, tid=%s) : %s", self._reg_id, self._tid, e)
-        return "Inconnu"
+        th = self.coordinator.get_thermostat(self._reg_id, self._tid)
+        if not th:
+            return "Inconnu"
+        return "Batterie à changer" if th.is_battery_low else "Batterie OK"
+
+    @property
+    def device_info(self):
+        return {
+            'identifiers': {(DOMAIN, f'baillclim_reg_{self._reg_id}')},
+            'name': f'BaillClim Régulation {self._reg_id}',
+            'manufacturer': 'BaillConnect',
+            'model': 'Régulation',
+            'entry_type': 'service'
+        }
+
+
+# Détail des histogrammes : affiché, mais pas enregistré par le recorder
+_HISTOGRAM_ATTRIBUTES = frozenset({"count", "mean_ms", "min_ms", "max_ms", "last_ms", "buckets_ms"})
+
+
+class BaillclimMetricSensor(BaillclimEntity, Entity):
+    """Métrique d'exécution : état scalaire, écrit seulement quand la mesure a avancé."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _last_marker = None
+
+    def __init__(self, coordinator, unique_id, name, icon):
+        super().__init__(coordinator)
+        self._attr_name = name
+        self._attr_unique_id = unique_id
+        self._attr_icon = icon
+
+    def _marker(self):
+        """Valeur qui change quand une nouvelle mesure est disponible."""
+        return None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # Une écriture ou un poll sans nouvelle mesure ne réécrit pas l'état
+        marker = (self.coordinator.last_update_success, self._marker())
+        if marker != self._last_marker:
+            self._last_marker = marker
+            self.async_write_ha_state()
+
+
+class FetchLatencySensor(BaillclimMetricSensor):
+    """Latence de la dernière lecture de la régulation (histogramme en attributs)."""
+
+    _attr_unit_of_measurement = "ms"
+    _unrecorded_attributes = _HISTOGRAM_ATTRIBUTES
+
+    def __init__(self, coordinator, reg_id):
+        super().__init__(
+            coordinator, f"baillclim_metric_fetch_latency_{reg_id}", f"Latence lecture {reg_id}", "mdi:timer-outline"
+        )
+        self._reg_id = reg_id
+        self._topology_key = ("regulation", reg_id)
+
+    @property
+    def _histogram(self):
+        return self.coordinator.metrics.fetch_latency.get(self._reg_id)
+
+    def _marker(self):
+        histogram = self._histogram
+        return histogram.count if histogram else 0
+
+    @property
+    def state(self):
+        histogram = self._histogram
+        return None if histogram is None or histogram.last is None else round(histogram.last)
+
+    @property
+    def extra_state_attributes(self):
+        histogram = self._histogram
+        return histogram.as_dict() if histogram else {}
 
     @property
     def device_info(self):
@@ -126,3 +199,53 @@ class ThermostatBatteryLowSensor(CoordinatorEntity, Entity):
             'model': 'Régulation',
             'entry_type': 'service'
         }
+
+
+class PollCycleSensor(BaillclimMetricSensor):
+    """Durée du dernier cycle de polling complet (une seule entité par entrée)."""
+
+    _attr_unit_of_measurement = "ms"
+    _unrecorded_attributes = _HISTOGRAM_ATTRIBUTES | {"update_interval_s"}
+
+    def __init__(self, coordinator, entry_id):
+        super().__init__(
+            coordinator, f"baillclim_metric_poll_cycle_{entry_id}", "Durée cycle de polling", "mdi:timer-sync-outline"
+        )
+
+    def _marker(self):
+        return self.coordinator.metrics.poll_cycle.count
+
+    @property
+    def state(self):
+        last = self.coordinator.metrics.poll_cycle.last
+        return None if last is None else round(last)
+
+    @property
+    def extra_state_attributes(self):
+        return {
+            **self.coordinator.metrics.poll_cycle.as_dict(),
+            "update_interval_s": self.coordinator.update_interval.total_seconds(),
+        }
+
+
+class RequestCountSensor(BaillclimMetricSensor):
+    """Nombre total de requêtes HTTP de l'entrée ; détail par endpoint/statut et événements en attributs."""
+
+    _unrecorded_attributes = frozenset({"requests", "events"})
+
+    def __init__(self, coordinator, entry_id):
+        super().__init__(
+            coordinator, f"baillclim_metric_requests_{entry_id}", "Requêtes BaillConnect", "mdi:swap-vertical"
+        )
+
+    def _marker(self):
+        return self.state
+
+    @property
+    def state(self):
+        return sum(self.coordinator.metrics.requests.values())
+
+    @property
+    def extra_state_attributes(self):
+        metrics = self.coordinator.metrics.as_dict()
+        return {"requests": metrics["requests"], "events": metrics["events"]}
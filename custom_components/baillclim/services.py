@@ -0,0 +1,232 @@
+import asyncio
+import logging
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+
+from .const import DOMAIN, UC_MODE_NAMES
+from .schedule import DAYS, HOURS, ZoneSchedule
+from .snapshots import SnapshotStore
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_GET_ZONE_SCHEDULE = "get_zone_schedule"
+SERVICE_SET_ZONE_SCHEDULE = "set_zone_schedule"
+SERVICE_REDISCOVER = "rediscover"
+SERVICE_APPLY = "apply"
+SERVICE_SNAPSHOT_SAVE = "snapshot_save"
+SERVICE_SNAPSHOT_RESTORE = "snapshot_restore"
+SERVICE_SNAPSHOT_DELETE = "snapshot_delete"
+SERVICE_SNAPSHOT_LIST = "snapshot_list"
+
+ZONE_SCHEMA = {
+    vol.Required("regulation_id"): vol.Coerce(int),
+    vol.Required("zone_id"): vol.Coerce(int),
+}
+
+GET_ZONE_SCHEDULE_SCHEMA = vol.Schema(ZONE_SCHEMA)
+
+SET_ZONE_SCHEDULE_SCHEMA = vol.Schema({
+    **ZONE_SCHEMA,
+    vol.Required("schedule"): vol.All(
+        cv.ensure_list,
+        vol.Length(min=DAYS, max=DAYS),
+        [vol.All(cv.string, vol.Match(rf"^[0-9-]{{{HOURS}}}$"))],
+    ),
+})
+
+
+SNAPSHOT_SCHEMA = vol.Schema({
+    vol.Required("regulation_id"): vol.Coerce(int),
+    vol.Required("name"): vol.All(cv.string, vol.Length(min=1, max=64)),
+})
+
+SNAPSHOT_LIST_SCHEMA = vol.Schema({
+    vol.Required("regulation_id"): vol.Coerce(int),
+})
+
+SETPOINT = vol.All(vol.Coerce(float), vol.Range(min=16, max=30))
+THERMOSTAT_FIELDS = {
+    "is_on": cv.boolean,
+    "t1_t2": vol.All(vol.Coerce(int), vol.In([1, 2])),
+    "setpoint_hot_t1": SETPOINT,
+    "setpoint_hot_t2": SETPOINT,
+    "setpoint_cool_t1": SETPOINT,
+    "setpoint_cool_t2": SETPOINT,
+}
+ZONE_FIELDS = {
+    # 0 = zone inactive, 3 = zone active (seuls modes pilotés par l'intégration)
+    "mode": vol.All(vol.Coerce(int), vol.In([0, 3])),
+}
+
+
+def _validate_target(target: dict) -> dict:
+    """Chaque champ doit viser le bon enregistrement (thermostat, zone ou régulation)."""
+    if not any(key in target for key in (*THERMOSTAT_FIELDS, *ZONE_FIELDS, "uc_mode")):
+        raise vol.Invalid("Aucune valeur à appliquer")
+    if "thermostat_id" not in target and any(key in target for key in THERMOSTAT_FIELDS):
+        raise vol.Invalid(f"{', '.join(THERMOSTAT_FIELDS)} nécessitent thermostat_id")
+    if "zone_id" not in target and any(key in target for key in ZONE_FIELDS):
+        raise vol.Invalid("mode nécessite zone_id")
+    return target
+
+
+APPLY_TARGET_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Required("regulation_id"): vol.Coerce(int),
+        vol.Exclusive("thermostat_id", "record"): vol.Coerce(int),
+        vol.Exclusive("zone_id", "record"): vol.Coerce(int),
+        vol.Optional("uc_mode"): vol.All(vol.Coerce(int), vol.In(list(UC_MODE_NAMES))),
+        **{vol.Optional(key): validator for key, validator in THERMOSTAT_FIELDS.items()},
+        **{vol.Optional(key): validator for key, validator in ZONE_FIELDS.items()},
+    }),
+    _validate_target,
+)
+
+APPLY_SCHEMA = vol.Schema({
+    vol.Required("targets"): vol.All(cv.ensure_list, vol.Length(min=1), [APPLY_TARGET_SCHEMA]),
+})
+
+
+def _target_payload(coordinator, target: dict) -> dict:
+    """Clés API d'une cible, après vérification que le thermostat ou la zone existe."""
+    reg_id = target["regulation_id"]
+    payload = {}
+    if "uc_mode" in target:
+        payload["uc_mode"] = target["uc_mode"]
+
+    if "thermostat_id" in target:
+        thermostat_id = target["thermostat_id"]
+        if coordinator.get_thermostat(reg_id, thermostat_id) is None:
+            raise HomeAssistantError(f"Thermostat {thermostat_id} introuvable dans la régulation {reg_id}")
+        payload.update({
+            f"thermostats.{thermostat_id}.{key}": target[key] for key in THERMOSTAT_FIELDS if key in target
+        })
+
+    if "zone_id" in target:
+        zone_id = target["zone_id"]
+        if coordinator.get_zone(reg_id, zone_id) is None:
+            raise HomeAssistantError(f"Zone {zone_id} introuvable dans la régulation {reg_id}")
+        payload.update({f"zones.{zone_id}.{key}": target[key] for key in ZONE_FIELDS if key in target})
+
+    return payload
+
+
+def _coordinator_for_regulation(hass: HomeAssistant, reg_id: int):
+    """Coordinator (entrée de configuration) qui gère la régulation `reg_id`."""
+    for coordinator in hass.data.get(DOMAIN, {}).values():
+        if coordinator.get_regulation(reg_id):
+            return coordinator
+    raise HomeAssistantError(f"Régulation BaillConnect {reg_id} introuvable")
+
+
+async def async_setup_services(hass: HomeAssistant):
+    """Services du domaine baillclim (enregistrés une seule fois pour toutes les entrées)."""
+    snapshots = SnapshotStore(hass)
+
+    async def async_get_zone_schedule(call: ServiceCall) -> ServiceResponse:
+        reg_id = call.data["regulation_id"]
+        zone_id = call.data["zone_id"]
+        schedule = _coordinator_for_regulation(hass, reg_id).get_zone_schedule(reg_id, zone_id)
+        if schedule is None:
+            raise HomeAssistantError(f"Zone {zone_id} introuvable dans la régulation {reg_id}")
+        return {"regulation_id": reg_id, "zone_id": zone_id, "schedule": schedule.packed()}
+
+    async def async_set_zone_schedule(call: ServiceCall):
+        reg_id = call.data["regulation_id"]
+        zone_id = call.data["zone_id"]
+        coordinator = _coordinator_for_regulation(hass, reg_id)
+        current = coordinator.get_zone_schedule(reg_id, zone_id)
+        if current is None:
+            raise HomeAssistantError(f"Zone {zone_id} introuvable dans la régulation {reg_id}")
+
+        # Seuls les créneaux différents du planning actuel sont envoyés
+        payload = current.diff_payload(zone_id, ZoneSchedule.from_packed(call.data["schedule"]))
+        if not payload:
+            _LOGGER.debug("Planning zone %s (reg_id=%s) déjà à jour", zone_id, reg_id)
+            return
+        if not await coordinator.writer.async_write(reg_id, payload):
+            raise HomeAssistantError(f"Échec de l'écriture du planning de la zone {zone_id}")
+
+    async def async_apply(call: ServiceCall):
+        # 📦 Cibles regroupées par régulation : un seul POST par régulation
+        batches: dict[int, tuple] = {}
+        for target in call.data["targets"]:
+            reg_id = target["regulation_id"]
+            if reg_id not in batches:
+                batches[reg_id] = (_coordinator_for_regulation(hass, reg_id), {})
+            coordinator, payload = batches[reg_id]
+            payload.update(_target_payload(coordinator, target))
+
+        results = await asyncio.gather(*(
+            coordinator.writer.async_write(reg_id, payload) for reg_id, (coordinator, payload) in batches.items()
+        ))
+        _LOGGER.info("📦 apply : %s régulation(s), %s clé(s)", len(batches),
+                     sum(len(payload) for _, payload in batches.values()))
+
+        failed = [reg_id for reg_id, success in zip(batches, results) if not success]
+        if failed:
+            raise HomeAssistantError(f"Échec de l'écriture pour les régulations {failed}")
+
+    async def async_snapshot_save(call: ServiceCall):
+        reg_id = call.data["regulation_id"]
+        regulation = _coordinator_for_regulation(hass, reg_id).get_regulation(reg_id)
+        await snapshots.async_save_snapshot(reg_id, call.data["name"], regulation.writable_state())
+        _LOGGER.info("📸 Snapshot '%s' enregistré (reg_id=%s)", call.data["name"], reg_id)
+
+    async def async_snapshot_restore(call: ServiceCall):
+        reg_id = call.data["regulation_id"]
+        name = call.data["name"]
+        snapshot = await snapshots.async_get_snapshot(reg_id, name)
+        if snapshot is None:
+            raise HomeAssistantError(f"Snapshot '{name}' introuvable pour la régulation {reg_id}")
+
+        # Seules les clés qui diffèrent de l'état actuel partent, en une seule requête
+        coordinator = _coordinator_for_regulation(hass, reg_id)
+        payload = coordinator.get_regulation(reg_id).diff_payload(snapshot["state"])
+        if not payload:
+            _LOGGER.debug("Snapshot '%s' déjà appliqué (reg_id=%s)", name, reg_id)
+            return
+        if not await coordinator.writer.async_write(reg_id, payload):
+            raise HomeAssistantError(f"Échec de la restauration du snapshot '{name}'")
+        _LOGGER.info("📸 Snapshot '%s' restauré (reg_id=%s) : %s clé(s)", name, reg_id, len(payload))
+
+    async def async_snapshot_delete(call: ServiceCall):
+        if not await snapshots.async_delete_snapshot(call.data["regulation_id"], call.data["name"]):
+            raise HomeAssistantError(f"Snapshot '{call.data['name']}' introuvable")
+
+    async def async_snapshot_list(call: ServiceCall) -> ServiceResponse:
+        reg_id = call.data["regulation_id"]
+        return {"regulation_id": reg_id, "snapshots": await snapshots.async_list_snapshots(reg_id)}
+
+    async def async_rediscover(call: ServiceCall):
+        for coordinator in list(hass.data.get(DOMAIN, {}).values()):
+            await coordinator.async_rediscover()
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_ZONE_SCHEDULE,
+        async_get_zone_schedule,
+        schema=GET_ZONE_SCHEDULE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_ZONE_SCHEDULE,
+        async_set_zone_schedule,
+        schema=SET_ZONE_SCHEDULE_SCHEMA,
+    )
+    hass.services.async_register(DOMAIN, SERVICE_REDISCOVER, async_rediscover)
+    hass.services.async_register(DOMAIN, SERVICE_APPLY, async_apply, schema=APPLY_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_SNAPSHOT_SAVE, async_snapshot_save, schema=SNAPSHOT_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_SNAPSHOT_RESTORE, async_snapshot_restore, schema=SNAPSHOT_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_SNAPSHOT_DELETE, async_snapshot_delete, schema=SNAPSHOT_SCHEMA)
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SNAPSHOT_LIST,
+        async_snapshot_list,
+        schema=SNAPSHOT_LIST_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -1,94 +1,350 @@
 import re
+import asyncio
 import logging
-import requests
 import urllib.parse
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from http.cookies import SimpleCookie
+
+import aiohttp
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.json import json_bytes
+from homeassistant.helpers.storage import Store
+from homeassistant.util.json import json_loads
+from yarl import URL
+
+from .const import (
+    API_REGULATIONS_PATH,
+    BASE_URL,
+    CONNECT_TIMEOUT,
+    DOMAIN,
+    LOGIN_PATH,
+    REGULATIONS_PATH,
+    USER_AGENT,
+)
+from .metrics import RuntimeMetrics
+from .retry import BaillconnectHTTPError
+
+SESSION_STORAGE_VERSION = 1
+
+# 🔎 Motifs précompilés, appliqués aux octets bruts au fil de la lecture (sans décoder la page)
+_LOGIN_TOKEN_RE = re.compile(rb'name="_token" value="([^"]+)"')
+_CSRF_META_RE = re.compile(rb'<meta name="csrf-token" content="([^"]+)">')
+_REGULATION_ID_RE = re.compile(rb"/client/regulations/(\d+)")
+_HEAD_END = b"</head>"
+_CHUNK_SIZE = 8192
+# Fin de bloc conservée d'un morceau à l'autre : un motif coupé entre deux morceaux reste trouvable
+_OVERLAP = 512
 
 _LOGGER = logging.getLogger(__name__)
 
 
+class RegulationNotFoundError(Exception):
+    """La régulation n'existe plus sur le compte (HTTP 404)."""
+
+
+@dataclass(slots=True, frozen=True)
+class RegulationAuth:
+    """Contexte d'authentification d'une régulation, immuable et capturé par chaque requête.
+
+    Le jeton CSRF et le Referer viennent de la page de la régulation ; le XSRF est
+    relu dans le cookie jar au moment de l'envoi (il peut tourner entre deux requêtes).
+    """
+
+    reg_id: int
+    csrf_token: str
+    referer: str
+    fetched_at: datetime
+
+    def headers(self, origin: str, xsrf_cookie: str | None) -> dict:
+        headers = {
+            "Content-Type": "application/json;charset=UTF-8",
+            "Accept": "application/json, text/plain, */*",
+            "X-CSRF-TOKEN": self.csrf_token,
+            "X-Requested-With": "XMLHttpRequest",
+            "Origin": origin,
+            "Referer": self.referer,
+        }
+        if xsrf_cookie:
+            headers["X-XSRF-TOKEN"] = urllib.parse.unquote(xsrf_cookie)
+        return headers
+
+
 class SessionManager:
-    _session = None
-    _csrf_token = None
-    _xsrf_token = None
-    _email = None
-    _password = None
-    _timeout = 15
-    _last_cookie_refresh = None
+    """Session BaillConnect d'une entrée de configuration (identifiants, cookies, jetons)."""
+
     _cookie_ttl = timedelta(minutes=8)
+    _token_ttl = timedelta(minutes=30)
 
-    @classmethod
-    async def async_initialize(cls, hass, email: str, password: str, reg_id: int = 0, timeout: int = 15):
-        cls._email = email
-        cls._password = password
-        cls._timeout = timeout
+    def __init__(self, hass: HomeAssistant, email: str, password: str, timeout: int = 15,
+                 entry_id: str | None = None, base_url: str = BASE_URL,
+                 metrics: RuntimeMetrics | None = None):
+        self._hass = hass
+        self.metrics = metrics or RuntimeMetrics()
+        self.base_url = base_url
+        self.login_url = f"{base_url}{LOGIN_PATH}"
+        self.regulations_url = f"{base_url}{REGULATIONS_PATH}"
+        self._email = email
+        self._password = password
+        self._timeout = timeout
+        self._session: aiohttp.ClientSession | None = None
+        self._auth: dict[int, RegulationAuth] = {}
+        self._scrape_locks: dict[int, asyncio.Lock] = {}
+        self._refresh_lock = asyncio.Lock()
+        self._last_cookie_refresh = None
+        # 💾 Cookies persistés (fichier .storage privé) pour éviter le login à chaque redémarrage
+        self._store = _session_store(hass, entry_id) if entry_id else None
 
-        if cls._session is None:
-            cls._session = requests.Session()
-            cls._session.headers.update({"User-Agent": "HomeAssistant-BaillClim/1.0"})
+    async def async_initialize(self, reg_id: int = 0):
+        if self._session is None:
+            # Session aiohttp dédiée à l'entrée (cookie jar propre), connecteur keep-alive de HA
+            self._session = async_create_clientsession(self._hass, headers={"User-Agent": USER_AGENT})
+            await self._async_restore_cookies()
 
         now = datetime.now()
-        if cls._last_cookie_refresh is None or (now - cls._last_cookie_refresh > cls._cookie_ttl):
-            await hass.async_add_executor_job(cls._refresh_cookie)
+        if self._last_cookie_refresh is None or (now - self._last_cookie_refresh > self._cookie_ttl):
+            await self.async_refresh_cookie()
 
         if reg_id:
-            await hass.async_add_executor_job(cls._initialize_for_regulation, reg_id)
+            await self._async_regulation_auth(reg_id)
 
-    @classmethod
-    def _refresh_cookie(cls):
-        _LOGGER.debug("🔁 Tentative de vérification de la validité du cookie...")
-        response = cls._session.get("https://www.baillconnect.com/client/connexion", timeout=cls._timeout)
+    async def async_close(self):
+        if self._session is not None:
+            await self._async_save_cookies()
+            await self._session.close()
+            self._session = None
+
+    async def _async_restore_cookies(self):
+        if self._store is None:
+            return
+        stored = await self._store.async_load()
+        if not stored or not stored.get("cookies"):
+            return
+
+        cookies = SimpleCookie()
+        for cookie in stored["cookies"]:
+            cookies[cookie["key"]] = cookie["value"]
+            if cookie.get("domain"):
+                cookies[cookie["key"]]["domain"] = cookie["domain"]
+            cookies[cookie["key"]]["path"] = cookie.get("path") or "/"
+        self._session.cookie_jar.update_cookies(cookies, URL(self.base_url))
+
+        try:
+            self._last_cookie_refresh = datetime.fromisoformat(stored["verified_at"])
+        except (KeyError, TypeError, ValueError):
+            self._last_cookie_refresh = None
+        _LOGGER.debug("🍪 Cookies restaurés (vérifiés le %s)", self._last_cookie_refresh)
+
+    async def _async_save_cookies(self):
+        if self._store is None or self._session is None or self._last_cookie_refresh is None:
+            return
+        await self._store.async_save({
+            "verified_at": self._last_cookie_refresh.isoformat(),
+            "cookies": [
+                {
+                    "key": cookie.key,
+                    "value": cookie.value,
+                    "domain": cookie["domain"],
+                    "path": cookie["path"],
+                }
+                for cookie in self._session.cookie_jar
+            ],
+        })
+
+    def _client_timeout(self, timeout: int | None = None) -> aiohttp.ClientTimeout:
+        total = timeout or self._timeout
+        return aiohttp.ClientTimeout(
+            total=total,
+            connect=min(CONNECT_TIMEOUT, total),
+            sock_read=total,
+        )
+
+    async def async_refresh_cookie(self):
+        """Renouvelle le cookie une seule fois même si plusieurs appels échouent en parallèle."""
+        requested_at = datetime.now()
+        async with self._refresh_lock:
+            if self._last_cookie_refresh is not None and self._last_cookie_refresh >= requested_at:
+                return
+            await self._refresh_cookie()
 
-        if response.status_code != 200:
-            raise Exception(f"❌ Échec GET /connexion – code HTTP {response.status_code}")
+    async def _refresh_cookie(self):
+        _LOGGER.debug("🔁 Tentative de vérification de la validité du cookie...")
+        self.metrics.record_event("cookie_check")
+        async with self._session.get(self.login_url, timeout=self._client_timeout()) as response:
+            self.metrics.record_request(f"GET {LOGIN_PATH}", response.status)
+            if response.status != 200:
+                raise BaillconnectHTTPError(response.status, f"❌ Échec GET /connexion – code HTTP {response.status}")
+            token_match = await _async_search_stream(response, _LOGIN_TOKEN_RE)
 
-        token_match = re.search(r'name="_token" value="([^"]+)"', response.text)
         if not token_match:
             _LOGGER.info("✅ Session toujours valide — pas de login nécessaire.")
-            cls._last_cookie_refresh = datetime.now()
+            self._last_cookie_refresh = datetime.now()
+            await self._async_save_cookies()
             return
 
         _LOGGER.debug("🔐 Reconnexion nécessaire, token trouvé dans page de login.")
-        login_token = token_match.group(1)
+        login_token = token_match.group(1).decode()
 
-        response = cls._session.post("https://www.baillconnect.com/client/connexion", data={
+        async with self._session.post(self.login_url, data={
             "_token": login_token,
-            "email": cls._email,
-            "password": cls._password
-        }, timeout=cls._timeout)
+            "email": self._email,
+            "password": self._password
+        }, timeout=self._client_timeout()) as response:
+            self.metrics.record_request(f"POST {LOGIN_PATH}", response.status)
+            if response.status not in (200, 302):
+                raise BaillconnectHTTPError(response.status, "❌ Authentification échouée.")
+
+        self._last_cookie_refresh = datetime.now()
+        self.metrics.record_event("login")
+        _LOGGER.info("🍪 Cookie renouvelé avec succès à %s", self._last_cookie_refresh)
+        await self._async_save_cookies()
+
+    def _get_cookie(self, name: str) -> str | None:
+        for cookie in self._session.cookie_jar:
+            if cookie.key == name:
+                return cookie.value
+        return None
 
-        if response.status_code not in (200, 302):
-            raise Exception("❌ Authentification échouée.")
+    def _fresh_auth(self, reg_id: int) -> RegulationAuth | None:
+        auth = self._auth.get(reg_id)
+        if auth is None or datetime.now() - auth.fetched_at > self._token_ttl:
+            return None
+        return auth
 
-        cls._last_cookie_refresh = datetime.now()
-        _LOGGER.info("🍪 Cookie renouvelé avec succès à %s", cls._last_cookie_refresh)
+    async def _async_regulation_auth(self, reg_id: int) -> RegulationAuth:
+        """Contexte en cache : la page n'est relue qu'à expiration ou après un rejet.
 
-    @classmethod
-    def _initialize_for_regulation(cls, reg_id: int):
-        regulations_url = f"https://www.baillconnect.com/client/regulations/{reg_id}"
-        page = cls._session.get(regulations_url, timeout=cls._timeout)
+        Un verrou par régulation : des requêtes simultanées vers la même régulation
+        partagent un seul scrape, celles vers d'autres régulations ne l'attendent pas.
+        """
+        auth = self._fresh_auth(reg_id)
+        if auth is not None:
+            return auth
+        async with self._scrape_locks.setdefault(reg_id, asyncio.Lock()):
+            auth = self._fresh_auth(reg_id)
+            if auth is None:
+                auth = self._auth[reg_id] = await self._initialize_for_regulation(reg_id)
+            return auth
 
-        csrf_token = re.search(r'<meta name="csrf-token" content="([^"]+)">', page.text)
-        xsrf_cookie = cls._session.cookies.get("XSRF-TOKEN")
+    def invalidate_regulation_tokens(self, reg_id: int, auth: RegulationAuth | None = None):
+        """Oublie le contexte de `reg_id` ; si `auth` est donné, seulement s'il est encore le contexte en cache."""
+        if auth is None or self._auth.get(reg_id) is auth:
+            self._auth.pop(reg_id, None)
 
-        if not csrf_token or not xsrf_cookie:
+    async def _initialize_for_regulation(self, reg_id: int) -> RegulationAuth:
+        regulations_url = f"{self.regulations_url}/{reg_id}"
+        self.metrics.record_event("csrf_scrape")
+        async with self._session.get(regulations_url, timeout=self._client_timeout()) as page:
+            self.metrics.record_request(f"GET {REGULATIONS_PATH}/{{id}}", page.status)
+            if page.status == 404:
+                raise RegulationNotFoundError(f"Régulation {reg_id} introuvable")
+            # La balise meta est dans <head> : la lecture s'arrête dès qu'elle est trouvée
+            csrf_token = await _async_search_stream(page, _CSRF_META_RE, stop=_HEAD_END)
+
+        if not csrf_token or not self._get_cookie("XSRF-TOKEN"):
             raise Exception("❌ Token CSRF/XSRF manquant.")
 
-        cls._csrf_token = csrf_token.group(1)
-        cls._xsrf_token = urllib.parse.unquote(xsrf_cookie)
+        return RegulationAuth(
+            reg_id=reg_id,
+            csrf_token=csrf_token.group(1).decode(),
+            referer=regulations_url,
+            fetched_at=datetime.now(),
+        )
+
+    async def async_get_regulation_ids(self, timeout: int | None = None) -> list[int]:
+        """Identifiants des régulations du compte, extraits de la liste au fil de la lecture."""
+        endpoint = f"GET {REGULATIONS_PATH}"
+        try:
+            async with self._session.get(self.regulations_url, timeout=self._client_timeout(timeout)) as response:
+                self.metrics.record_request(endpoint, response.status)
+                response.raise_for_status()
+                return sorted(await _async_findall_stream(response, _REGULATION_ID_RE))
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            self.metrics.record_request(endpoint, "error")
+            raise
+
+    async def async_post_regulation(self, reg_id: int, payload: dict, timeout: int | None = None):
+        """POST JSON sur l'API d'une régulation → (code HTTP, JSON décodé ou None, taille du corps).
+
+        Chaque envoi porte ses propres en-têtes, tirés du contexte de la régulation
+        visée. Si l'API les rejette (401/419, ou HTTP 200 au corps vide), ce contexte
+        (et lui seul) est oublié, la session est vérifiée, la page relue et la requête
+        rejouée une fois. Les autres statuts (5xx…) sont retournés tels quels.
+        """
+        auth = await self._async_regulation_auth(reg_id)
+        status, data, size = await self._async_post(auth, payload, timeout)
+        if status == 404:
+            raise RegulationNotFoundError(f"Régulation {reg_id} introuvable")
+
+        if status in (401, 419) or (status == 200 and data is None):
+            _LOGGER.warning("🔄 Jetons rejetés (reg_id=%s, HTTP %s), renouvellement", reg_id, status)
+            self.metrics.record_event("token_rejected")
+            self.invalidate_regulation_tokens(reg_id, auth)
+            await self.async_refresh_cookie()
+            auth = await self._async_regulation_auth(reg_id)
+            status, data, size = await self._async_post(auth, payload, timeout)
+
+        return status, data, size
+
+    async def _async_post(self, auth: RegulationAuth, payload: dict, timeout: int | None = None):
+        url = f"{self.base_url}{API_REGULATIONS_PATH}/{auth.reg_id}"
+        endpoint = f"POST {API_REGULATIONS_PATH}/{{id}}"
+        try:
+            async with self._session.post(
+                url,
+                data=json_bytes(payload),
+                headers=auth.headers(self.base_url, self._get_cookie("XSRF-TOKEN")),
+                timeout=self._client_timeout(timeout),
+            ) as response:
+                self.metrics.record_request(endpoint, response.status)
+                body = await response.read()
+                if response.status != 200 or not body:
+                    _LOGGER.debug("API %s → HTTP %s : %s", url, response.status, body[:200])
+                    return response.status, None, len(body)
+                try:
+                    # Décodage unique des octets bruts par le backend JSON rapide de HA
+                    return response.status, json_loads(body), len(body)
+                except ValueError:
+                    _LOGGER.debug("API %s → réponse non JSON : %s", url, body[:200])
+                    return response.status, None, len(body)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            self.metrics.record_request(endpoint, "error")
+            raise
+
+
+async def _async_search_stream(response: aiohttp.ClientResponse, pattern: re.Pattern,
+                               stop: bytes | None = None) -> re.Match | None:
+    """Premier `pattern` du corps lu par morceaux ; s'arrête au premier résultat ou au marqueur `stop`."""
+    tail = b""
+    async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+        buffer = tail + chunk
+        match = pattern.search(buffer)
+        if match:
+            return match
+        if stop is not None and stop in buffer:
+            return None
+        tail = buffer[-_OVERLAP:]
+    return None
+
+
+async def _async_findall_stream(response: aiohttp.ClientResponse, pattern: re.Pattern) -> set[int]:
+    """Entiers capturés par `pattern` dans tout le corps, sans le garder en mémoire."""
+    found = set()
+    tail = b""
+    async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+        buffer = tail + chunk
+        # Un nombre collé à la fin du morceau peut continuer dans le suivant : il sera relu via `tail`
+        found.update(int(m.group(1)) for m in pattern.finditer(buffer) if m.end() < len(buffer))
+        tail = buffer[-_OVERLAP:]
+    found.update(int(m.group(1)) for m in pattern.finditer(tail))
+    return found
+
+
+def _session_store(hass: HomeAssistant, entry_id: str) -> Store:
+    return Store(hass, SESSION_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.session", private=True)
 
-        cls._session.headers.update({
-            "Content-Type": "application/json;charset=UTF-8",
-            "Accept": "application/json, text/plain, */*",
-            "X-CSRF-TOKEN": cls._csrf_token,
-            "X-XSRF-TOKEN": cls._xsrf_token,
-            "X-Requested-With": "XMLHttpRequest",
-            "Origin": "https://www.baillconnect.com",
-            "Referer": regulations_url
-        })
 
-    @classmethod
-    async def async_get_session(cls, hass) -> requests.Session:
-        if cls._session is None:
-            raise Exception("❌ Session non initialisée.")
-        return cls._session
+async def async_remove_session_store(hass: HomeAssistant, entry_id: str):
+    """Supprime les cookies persistés d'une entrée (appelé à la suppression de l'intégration)."""
+    await _session_store(hass, entry_id).async_remove()
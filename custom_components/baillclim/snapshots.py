@@ -0,0 +1,56 @@
+import asyncio
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+SNAPSHOT_STORAGE_VERSION = 1
+
+
+class SnapshotStore:
+    """Snapshots nommés de l'état modifiable des régulations, persistés dans `.storage`.
+
+    Format : `{"<reg_id>": {"<nom>": {"captured_at": ..., "state": Regulation.writable_state()}}}`.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self._store = Store(hass, SNAPSHOT_STORAGE_VERSION, f"{DOMAIN}.snapshots")
+        self._snapshots: dict[str, dict] | None = None
+        self._load_lock = asyncio.Lock()
+
+    async def _async_load(self) -> dict[str, dict]:
+        # Un seul chargement : des appels simultanés partagent le même dict (sinon une sauvegarde se perd)
+        if self._snapshots is None:
+            async with self._load_lock:
+                if self._snapshots is None:
+                    self._snapshots = await self._store.async_load() or {}
+        return self._snapshots
+
+    async def async_save_snapshot(self, reg_id: int, name: str, state: dict):
+        snapshots = await self._async_load()
+        snapshots.setdefault(str(reg_id), {})[name] = {
+            "captured_at": dt_util.utcnow().isoformat(),
+            "state": state,
+        }
+        await self._store.async_save(snapshots)
+
+    async def async_get_snapshot(self, reg_id: int, name: str) -> dict | None:
+        return (await self._async_load()).get(str(reg_id), {}).get(name)
+
+    async def async_list_snapshots(self, reg_id: int) -> dict[str, str]:
+        """`{nom: date de capture}` des snapshots de la régulation."""
+        return {
+            name: snapshot["captured_at"]
+            for name, snapshot in (await self._async_load()).get(str(reg_id), {}).items()
+        }
+
+    async def async_delete_snapshot(self, reg_id: int, name: str) -> bool:
+        snapshots = await self._async_load()
+        if snapshots.get(str(reg_id), {}).pop(name, None) is None:
+            return False
+        if not snapshots[str(reg_id)]:
+            del snapshots[str(reg_id)]
+        await self._store.async_save(snapshots)
+        return True
@@ -1,87 +1,152 @@
+import asyncio
 import logging
+from datetime import datetime, timedelta
+
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.components.switch import SwitchEntity
-from homeassistant.helpers.update_coordinator import CoordinatorEntity, DataUpdateCoordinator
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import entity_platform
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
 
 from .const import DOMAIN
-from .session_manager import SessionManager
+from .entity import BaillclimEntity, async_setup_topology
+from .schedule import ZoneSchedule
 
 _LOGGER = logging.getLogger(__name__)
 
-BACKUP_SCHEDULES = {}
-BOOST_SWITCHES = {}
-BOOST_ACTIVATION_TRACKER = set()
+BOOST_STORAGE_VERSION = 1
+SERVICE_START_BOOST = "start_boost"
+# Nouvel essai de restauration après un échec d'écriture à l'échéance
+EXPIRY_RETRY_DELAY = timedelta(minutes=1)
+
+
+class BoostRegistry:
+    """État des boosts d'une entrée de configuration (un compte BaillConnect).
+
+    Les boosts actifs (mode, planning sauvegardé, échéance) sont persistés pour
+    survivre à un redémarrage ; l'échéance est suivie par un minuteur local.
+    Sans `entry_id`, rien n'est persisté.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str | None = None):
+        self.switches = {}
+        self.backup_schedules = {}
+        self.activation_tracker = set()
+        # (reg_id, zone_id) -> (mode, échéance UTC ou None)
+        self.active: dict[tuple[int, int], tuple[str, datetime | None]] = {}
+        self._timers: dict[tuple[int, int], CALLBACK_TYPE] = {}
+        self._hass = hass
+        self._store = _boost_store(hass, entry_id) if entry_id else None
+
+    async def async_load(self):
+        if self._store is None:
+            return
+        for key, record in (await self._store.async_load() or {}).items():
+            try:
+                reg_id, zone_id = (int(part) for part in key.split("_"))
+            except ValueError:
+                continue
+            boost_key = (reg_id, zone_id)
+            expires_at = dt_util.parse_datetime(record["expires_at"]) if record.get("expires_at") else None
+            self.active[boost_key] = (record["mode"], expires_at)
+            if record.get("backup"):
+                self.backup_schedules[boost_key] = ZoneSchedule.from_packed(record["backup"])
+
+    async def async_start(self, boost_key: tuple[int, int], mode: str, expires_at: datetime | None, on_expire):
+        self.active[boost_key] = (mode, expires_at)
+        self.track_expiry(boost_key, expires_at, on_expire)
+        await self._async_save()
+
+    async def async_end(self, boost_key: tuple[int, int]):
+        self._cancel_timer(boost_key)
+        if self.active.pop(boost_key, None) is not None:
+            await self._async_save()
+
+    @callback
+    def track_expiry(self, boost_key: tuple[int, int], expires_at: datetime | None, on_expire):
+        """(Re)programme la fin du boost ; une échéance passée déclenche `on_expire` aussitôt."""
+        self._cancel_timer(boost_key)
+        if expires_at is not None:
+            self._timers[boost_key] = async_track_point_in_utc_time(self._hass, on_expire, expires_at)
+
+    @callback
+    def async_cancel_timers(self):
+        for unsub in self._timers.values():
+            unsub()
+        self._timers.clear()
+
+    def _cancel_timer(self, boost_key: tuple[int, int]):
+        unsub = self._timers.pop(boost_key, None)
+        if unsub:
+            unsub()
+
+    async def _async_save(self):
+        if self._store is None:
+            return
+        await self._store.async_save({
+            f"{reg_id}_{zone_id}": {
+                "mode": mode,
+                "expires_at": expires_at.isoformat() if expires_at else None,
+                "backup": backup.packed() if (backup := self.backup_schedules.get((reg_id, zone_id))) else None,
+            }
+            for (reg_id, zone_id), (mode, expires_at) in self.active.items()
+        })
+
+
+def _boost_store(hass: HomeAssistant, entry_id: str) -> Store:
+    return Store(hass, BOOST_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.boosts")
+
+
+async def async_remove_boost_store(hass: HomeAssistant, entry_id: str):
+    """Supprime les boosts persistés d'une entrée."""
+    await _boost_store(hass, entry_id).async_remove()
 
 
-class ZoneSwitch(CoordinatorEntity, SwitchEntity):
-    def __init__(self, coordinator, reg_id, zone_id, zone_name):
+class ZoneSwitch(BaillclimEntity, SwitchEntity):
+    def __init__(self, coordinator, boosts: BoostRegistry, reg_id, zone_id, zone_name):
         super().__init__(coordinator)
+        self._boosts = boosts
         self._reg_id = reg_id
         self._zone_id = zone_id
         self._zone_name = zone_name
         self._attr_name = f"Activation Zone {zone_name.strip()}"
         self._attr_unique_id = f"baillclim_zone_{reg_id}_{zone_id}"
+        self._change_keys = (("zone", reg_id, zone_id),)
+        self._topology_key = ("zone", reg_id, zone_id)
         self._attr_icon = "mdi:vector-polyline"
 
     @property
     def is_on(self):
-        try:
-            data = self.coordinator.data.get("data", {})
-            for reg in data.get("regulations", []):
-                reg_data = reg.get("data", {}).get("data", {})
-                if reg_data.get("id") == self._reg_id:
-                    for zone in reg_data.get("zones", []):
-                        if zone.get("id") == self._zone_id:
-                            return zone.get("mode") == 3
-        except Exception as e:
-            _LOGGER.warning("Erreur is_on pour zone %s (reg %s) : %s", self._zone_id, self._reg_id, e)
-        return False
+        zone = self.coordinator.get_zone(self._reg_id, self._zone_id)
+        return zone is not None and zone.mode == 3
 
     async def _set_zone_mode(self, hass: HomeAssistant, value: int):
-        await SessionManager.async_initialize(
-            hass,
-            self.coordinator.config_entry.data["email"],
-            self.coordinator.config_entry.data["password"],
-            reg_id=self._reg_id
-        )
-        session = await SessionManager.async_get_session(hass)
-        url = f"https://www.baillconnect.com/api-client/regulations/{self._reg_id}"
         payload = {f"zones.{self._zone_id}.mode": value}
-        await hass.async_add_executor_job(lambda: session.post(url, json=payload, timeout=10))
+        await self.coordinator.writer.async_write(self._reg_id, payload)
 
     async def async_turn_on(self, **kwargs):
         await self._set_zone_mode(self.hass, 3)
-        await self.coordinator.async_request_refresh()
+
+    async def async_start_boost(self, duration: timedelta | None = None):
+        raise HomeAssistantError(f"{self.entity_id} n'est pas un interrupteur de boost")
 
     async def async_turn_off(self, **kwargs):
-        await self._set_zone_mode(self.hass, 0)
-        await self.coordinator.async_request_refresh()
+        restores = []
         for mode in ["confort", "eco"]:
-            switch = BOOST_SWITCHES.get((self._reg_id, self._zone_id, mode))
+            switch = self._boosts.switches.get((self._reg_id, self._zone_id, mode))
             if switch and switch.is_on:
                 switch._is_on = False
                 switch.async_write_ha_state()
-                await switch.force_restore_if_needed(force_restore=True)
-
-    async def async_update(self):
-        await super().async_update()
-        data = self.coordinator.data.get("data", {})
-        for reg in data.get("regulations", []):
-            reg_data = reg.get("data", {}).get("data", {})
-            if reg_data.get("id") == self._reg_id:
-                uc_mode = reg_data.get("uc_mode")
-                for zone in reg_data.get("zones", []):
-                    if zone.get("id") == self._zone_id:
-                        if uc_mode == 0 or zone.get("mode") != 3:
-                            for mode in ["confort", "eco"]:
-                                switch = BOOST_SWITCHES.get((self._reg_id, self._zone_id, mode))
-                                if switch and switch.is_on:
-                                    _LOGGER.info(f"❌ Désactivation du boost {mode} car uc_mode=0 ou zone inactive")
-                                    switch._is_on = False
-                                    switch.async_write_ha_state()
-                                    await switch.force_restore_if_needed(force_restore=True)
+                restores.append(switch.force_restore_if_needed(force_restore=True))
+
+        # Arrêt de la zone et restauration du planning partent dans le même POST
+        await asyncio.gather(self._set_zone_mode(self.hass, 0), *restores)
 
     @property
     def device_info(self):
@@ -94,63 +159,108 @@ class ZoneSwitch(CoordinatorEntity, SwitchEntity):
         }
 
 
-class BoostBaseSwitch(CoordinatorEntity, SwitchEntity):
-    def __init__(self, coordinator, reg_id, zone_id, zone_name, mode):
+class BoostBaseSwitch(BaillclimEntity, SwitchEntity):
+    def __init__(self, coordinator, boosts: BoostRegistry, reg_id, zone_id, zone_name, mode):
         super().__init__(coordinator)
+        self._boosts = boosts
         self._reg_id = reg_id
         self._zone_id = zone_id
         self._zone_name = zone_name
         self._mode = mode
         self._attr_name = f"Boost {mode.capitalize()} {zone_name.strip()}"
         self._attr_unique_id = f"baillclim_boost_{mode}_{reg_id}_{zone_id}"
+        self._change_keys = (("zone", reg_id, zone_id),)
+        self._topology_key = ("zone", reg_id, zone_id)
         self._attr_icon = "mdi:rocket-launch" if mode == "confort" else "mdi:leaf"
         self._is_on = False
-        BOOST_SWITCHES[(reg_id, zone_id, mode)] = self
+        self._expiry_pending = False
+        boosts.switches[(reg_id, zone_id, mode)] = self
+
+    async def async_will_remove_from_hass(self) -> None:
+        await super().async_will_remove_from_hass()
+        # Zone retirée de BaillConnect : plus de planning à restaurer
+        key = (self._reg_id, self._zone_id, self._mode)
+        if self._boosts.switches.get(key) is self and self._topology_key not in self.coordinator.topology:
+            self._boosts.switches.pop(key)
+            self._boosts.backup_schedules.pop((self._reg_id, self._zone_id), None)
+            self._boosts.activation_tracker.discard(self._attr_unique_id)
+            await self._boosts.async_end((self._reg_id, self._zone_id))
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Boost actif avant le redémarrage : reprise de l'état et du minuteur
+        mode, expires_at = self._boosts.active.get((self._reg_id, self._zone_id), (None, None))
+        if mode == self._mode:
+            self._is_on = True
+            self._boosts.activation_tracker.add(self._attr_unique_id)
+            self._boosts.track_expiry((self._reg_id, self._zone_id), expires_at, self._handle_expiry)
+            self.async_write_ha_state()
+        self._async_check_consistency()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        super()._handle_coordinator_update()
+        if self._expiry_pending and not self.coordinator.stale:
+            # Échéance passée pendant l'arrêt : restauration dès la première lecture réelle
+            self._expiry_pending = False
+            self.hass.async_create_task(self._async_expire())
+        self._async_check_consistency()
+
+    @callback
+    def _async_check_consistency(self):
+        """Boost actif alors que la zone est inactive ou le système à l'arrêt : fin du boost."""
+        # Snapshot persisté pas encore confirmé par une lecture : aucune décision dessus
+        if self.coordinator.stale:
+            return
+        zone = self.coordinator.get_zone(self._reg_id, self._zone_id)
+        if not zone:
+            return
+        regulation = self.coordinator.get_regulation(self._reg_id)
+        uc_mode = regulation.uc_mode if regulation else None
+        boost_id = self._attr_unique_id
+        if (uc_mode == 0 or zone.mode != 3) and (self._is_on or boost_id in self._boosts.activation_tracker):
+            _LOGGER.info(f"❌ Désactivation du boost {self._mode} (zone {self._zone_id}) car uc_mode=0 ou zone inactive")
+            self._is_on = False
+            self.async_write_ha_state()
+            self._boosts.activation_tracker.discard(boost_id)
+            self.hass.async_create_task(self.force_restore_if_needed(force_restore=True))
+
+    @property
+    def extra_state_attributes(self):
+        mode, expires_at = self._boosts.active.get((self._reg_id, self._zone_id), (None, None))
+        return {
+            **(super().extra_state_attributes or {}),
+            "expires_at": expires_at.isoformat() if mode == self._mode and expires_at else None,
+        }
 
     @property
     def is_on(self):
         return self._is_on
 
-    def _get_current_schedule(self):
-        data = self.coordinator.data.get("data", {})
-        for reg in data.get("regulations", []):
-            reg_data = reg.get("data", {}).get("data", {})
-            if reg_data.get("id") == self._reg_id:
-                for zone in reg_data.get("zones", []):
-                    if zone.get("id") == self._zone_id:
-                        return {
-                            f"zones.{self._zone_id}.schedule_{j}_{h}": zone.get(f"schedule_{j}_{h}")
-                            for j in range(7) for h in range(24)
-                        }
-        return {}
-
-    def _set_schedule(self, value):
-        return {f"zones.{self._zone_id}.schedule_{j}_{h}": value for j in range(7) for h in range(24)}
-
-    async def _post_api(self, hass: HomeAssistant, payload):
-        await SessionManager.async_initialize(
-            hass,
-            self.coordinator.config_entry.data["email"],
-            self.coordinator.config_entry.data["password"],
-            reg_id=self._reg_id
-        )
-        session = await SessionManager.async_get_session(hass)
-        url = f"https://www.baillconnect.com/api-client/regulations/{self._reg_id}"
-        await hass.async_add_executor_job(lambda: session.post(url, json=payload, timeout=10))
+    def _get_current_schedule(self) -> ZoneSchedule | None:
+        return self.coordinator.get_zone_schedule(self._reg_id, self._zone_id)
+
+    def _schedule_payload(self, target: ZoneSchedule) -> dict:
+        """Clés des seuls créneaux à modifier pour atteindre `target`."""
+        current = self._get_current_schedule()
+        if current is None:
+            return target.to_payload(self._zone_id)
+        return current.diff_payload(self._zone_id, target)
+
+    async def _post_api(self, hass: HomeAssistant, payload) -> bool:
+        return await self.coordinator.writer.async_write(self._reg_id, payload)
 
     async def async_turn_on(self, **kwargs):
+        await self.async_start_boost()
+
+    async def async_start_boost(self, duration: timedelta | None = None):
+        """Active le boost, jusqu'à l'arrêt manuel ou pendant `duration`."""
         boost_key = (self._reg_id, self._zone_id)
 
-        data = self.coordinator.data.get("data", {})
-        zone_active = False
-        uc_mode = None
-        for reg in data.get("regulations", []):
-            reg_data = reg.get("data", {}).get("data", {})
-            if reg_data.get("id") == self._reg_id:
-                uc_mode = reg_data.get("uc_mode")
-                for zone in reg_data.get("zones", []):
-                    if zone.get("id") == self._zone_id:
-                        zone_active = zone.get("mode") == 3
+        regulation = self.coordinator.get_regulation(self._reg_id)
+        uc_mode = regulation.uc_mode if regulation else None
+        zone = self.coordinator.get_zone(self._reg_id, self._zone_id)
+        zone_active = zone is not None and zone.mode == 3
 
         if uc_mode == 0:
             _LOGGER.warning(f"⛔ Boost {self._mode} refusé car le mode général (uc_mode) est sur 'Arrêt'")
@@ -180,51 +290,71 @@ class BoostBaseSwitch(CoordinatorEntity, SwitchEntity):
             )
             return
 
-        if boost_key not in BACKUP_SCHEDULES:
-            BACKUP_SCHEDULES[boost_key] = self._get_current_schedule()
+        current_schedule = self._get_current_schedule()
+        if boost_key not in self._boosts.backup_schedules and current_schedule is not None:
+            self._boosts.backup_schedules[boost_key] = current_schedule
 
         other_mode = "eco" if self._mode == "confort" else "confort"
-        other_switch = BOOST_SWITCHES.get((self._reg_id, self._zone_id, other_mode))
+        other_switch = self._boosts.switches.get((self._reg_id, self._zone_id, other_mode))
         if other_switch and other_switch.is_on:
             other_switch._is_on = False
             other_switch.async_write_ha_state()
 
         self._is_on = True
-        BOOST_ACTIVATION_TRACKER.add(self._attr_unique_id)
-        await self._post_api(self.hass, self._set_schedule(1 if self._mode == "confort" else 2))
+        self._boosts.activation_tracker.add(self._attr_unique_id)
+        expires_at = dt_util.utcnow() + duration if duration else None
+        await self._boosts.async_start(boost_key, self._mode, expires_at, self._handle_expiry)
+        payload = self._schedule_payload(ZoneSchedule.filled(1 if self._mode == "confort" else 2))
+        if payload:
+            await self._post_api(self.hass, payload)
+        self.async_write_ha_state()
+
+    @callback
+    def _handle_expiry(self, now: datetime) -> None:
+        self.hass.async_create_task(self._async_expire())
+
+    async def _async_expire(self):
+        if not self._is_on:
+            return
+        if self.coordinator.stale:
+            # Le planning en cache peut dater d'avant le boost : diff calculé après la première lecture
+            self._expiry_pending = True
+            return
+        _LOGGER.info(f"⏱️ Fin du boost {self._mode} (zone {self._zone_id}) → restauration du planning")
+        if not await self.force_restore_if_needed(force_restore=True):
+            _LOGGER.warning(f"❌ Restauration du planning de la zone {self._zone_id} échouée, nouvel essai dans 1 min")
+            self._boosts.track_expiry(
+                (self._reg_id, self._zone_id), dt_util.utcnow() + EXPIRY_RETRY_DELAY, self._handle_expiry
+            )
+            return
+        self._is_on = False
         self.async_write_ha_state()
-        await self.coordinator.async_request_refresh()
+        self._boosts.activation_tracker.discard(self._attr_unique_id)
 
     async def async_turn_off(self, **kwargs):
         self._is_on = False
         self.async_write_ha_state()
-        BOOST_ACTIVATION_TRACKER.discard(self._attr_unique_id)
+        self._boosts.activation_tracker.discard(self._attr_unique_id)
         await self.force_restore_if_needed()
-        await self.coordinator.async_request_refresh()
 
-    async def force_restore_if_needed(self, force_restore=False):
+    async def force_restore_if_needed(self, force_restore=False) -> bool:
+        """Restaure le planning sauvegardé ; False si l'écriture a échoué (boost gardé en mémoire et sur disque)."""
         boost_key = (self._reg_id, self._zone_id)
         other_mode = "eco" if self._mode == "confort" else "confort"
-        other_switch = BOOST_SWITCHES.get((self._reg_id, self._zone_id, other_mode))
+        other_switch = self._boosts.switches.get((self._reg_id, self._zone_id, other_mode))
         other_on = other_switch.is_on if other_switch else False
 
-        if (force_restore or not other_on) and boost_key in BACKUP_SCHEDULES:
-            await self._post_api(self.hass, BACKUP_SCHEDULES.pop(boost_key))
-
-    async def async_update(self):
-        data = self.coordinator.data.get("data", {})
-        for reg in data.get("regulations", []):
-            reg_data = reg.get("data", {}).get("data", {})
-            if reg_data.get("id") == self._reg_id:
-                for zone in reg_data.get("zones", []):
-                    if zone.get("id") == self._zone_id:
-                        boost_id = self._attr_unique_id
-                        if zone.get("mode") != 3 and (self._is_on or boost_id in BOOST_ACTIVATION_TRACKER):
-                            _LOGGER.info(f"Zone {self._zone_id} désactivée → désactivation du boost {self._mode}")
-                            self._is_on = False
-                            self.async_write_ha_state()
-                            BOOST_ACTIVATION_TRACKER.discard(boost_id)
-                            await self.force_restore_if_needed(force_restore=True)
+        if not (force_restore or not other_on):
+            return True
+        backup = self._boosts.backup_schedules.get(boost_key)
+        if backup is not None:
+            # Un seul POST : uniquement les créneaux qui diffèrent du planning sauvegardé
+            payload = self._schedule_payload(backup)
+            if payload and not await self._post_api(self.hass, payload):
+                return False
+            self._boosts.backup_schedules.pop(boost_key, None)
+        await self._boosts.async_end(boost_key)
+        return True
 
     @property
     def device_info(self):
@@ -239,26 +369,30 @@ class BoostBaseSwitch(CoordinatorEntity, SwitchEntity):
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback):
     coordinator = hass.data[DOMAIN][entry.entry_id]
-    if not coordinator.data:
+    if coordinator.data is None:
         _LOGGER.debug("Données manquantes, attente...")
         return
 
-    entities = []
-    data = coordinator.data.get("data", {})
-    for reg in data.get("regulations", []):
-        reg_data = reg.get("data", {}).get("data", {})
-        reg_id = reg_data.get("id")
-        if not reg_id:
-            continue
-        for zone in reg_data.get("zones", []):
-            zone_id = zone.get("id")
-            name = zone.get("name", f"Zone {zone_id}")
-            if zone_id is not None:
-                entities.append(ZoneSwitch(coordinator, reg_id, zone_id, name.strip()))
-                entities.append(BoostBaseSwitch(coordinator, reg_id, zone_id, name.strip(), "confort"))
-                entities.append(BoostBaseSwitch(coordinator, reg_id, zone_id, name.strip(), "eco"))
-
-    async_add_entities(entities)
-
-    for entity in entities:
-        hass.async_create_task(entity.async_update())
+    boosts = BoostRegistry(hass, entry.entry_id)
+    await boosts.async_load()
+    entry.async_on_unload(boosts.async_cancel_timers)
+
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_START_BOOST,
+        {vol.Optional("duration"): cv.positive_time_period},
+        "async_start_boost",
+    )
+
+    def _entities(key):
+        if key[0] != "zone":
+            return []
+        _, reg_id, zone_id = key
+        name = coordinator.get_zone(reg_id, zone_id).name
+        return [
+            ZoneSwitch(coordinator, boosts, reg_id, zone_id, name),
+            BoostBaseSwitch(coordinator, boosts, reg_id, zone_id, name, "confort"),
+            BoostBaseSwitch(coordinator, boosts, reg_id, zone_id, name, "eco"),
+        ]
+
+    async_setup_topology(hass, entry, coordinator, async_add_entities, _entities)
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import WRITE_BATCH_DELAY
+from .limiter import PRIORITY_WRITE
+from .model import Regulation
+from .retry import BaillconnectHTTPError, CircuitOpenError
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class WriteAggregator:
+    """Fusionne les commandes d'une même régulation en un seul POST.
+
+    Les écritures qui arrivent pendant `delay` secondes pour une régulation
+    sont regroupées dans un seul payload `clé: valeur` (la dernière valeur
+    gagne) et envoyées en une requête. Le résultat est publié immédiatement
+    dans le coordinator, suivi au besoin d'une relecture de la régulation.
+    Les minuteurs et envois en cours sont suivis pour être annulés au déchargement.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator, delay: float = WRITE_BATCH_DELAY):
+        self._hass = hass
+        self._coordinator = coordinator
+        self._delay = delay
+        self._pending: dict[int, tuple[dict, asyncio.Future]] = {}
+        self._timers: dict[int, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._closed = False
+
+    async def async_write(self, reg_id: int, payload: dict) -> bool:
+        """Ajoute `payload` au lot de la régulation et attend son envoi (True si HTTP 200)."""
+        if self._closed:
+            _LOGGER.warning("⛔ Entrée déchargée, écriture ignorée (reg_id=%s)", reg_id)
+            return False
+        batch = self._pending.get(reg_id)
+        if batch is None:
+            batch = ({}, self._hass.loop.create_future())
+            self._pending[reg_id] = batch
+            self._timers[reg_id] = self._hass.loop.call_later(self._delay, self._flush, reg_id)
+
+        batch[0].update(payload)
+        # shield : l'annulation d'un appelant ne doit pas annuler le lot des autres
+        return await asyncio.shield(batch[1])
+
+    @callback
+    def _flush(self, reg_id: int):
+        self._timers.pop(reg_id, None)
+        payload, future = self._pending.pop(reg_id)
+        task = self._hass.async_create_task(self._async_send(reg_id, payload, future))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def async_shutdown(self):
+        """Annule les lots en attente et les envois/relectures en cours (avant fermeture de la session)."""
+        self._closed = True
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for _, future in self._pending.values():
+            if not future.done():
+                future.set_result(False)
+        self._pending.clear()
+
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _async_post_once(self, reg_id: int, payload: dict):
+        session = self._coordinator.session
+        await session.async_initialize()
+        # Priorité maximale : passe devant le polling en attente
+        async with self._coordinator.scheduler.slot(reg_id, PRIORITY_WRITE):
+            status, response_data, size = await session.async_post_regulation(reg_id, payload, timeout=10)
+        if status != 200:
+            raise BaillconnectHTTPError(status)
+        return Regulation.from_response(response_data, size)
+
+    async def _async_send(self, reg_id: int, payload: dict, future: asyncio.Future):
+        success = False
+        reconcile = True
+        regulation = None
+        self._coordinator.async_note_activity()
+        try:
+            regulation = await self._coordinator.retry.async_call(
+                self._async_post_once, reg_id, payload, description=f"écriture régulation {reg_id}"
+            )
+            success = True
+            _LOGGER.info("✅ API OK (reg_id=%s) : %s clé(s) envoyée(s)", reg_id, len(payload))
+            _LOGGER.debug("Payload envoyé (reg_id=%s) : %s", reg_id, payload)
+        except CircuitOpenError as e:
+            # Service connu comme hors service : échec immédiat, pas de relecture
+            _LOGGER.warning("⛔ %s", e)
+            reconcile = False
+        except Exception as e:
+            _LOGGER.warning("❌ API ERROR (reg_id=%s) : %s pour %s", reg_id, e, list(payload))
+        finally:
+            # ⚡ État publié tout de suite (réponse du POST ou patch optimiste)
+            if success and self._coordinator.async_apply_write(reg_id, payload, regulation):
+                reconcile = False
+            if not future.done():
+                future.set_result(success)
+
+        # 🔍 Relecture de la seule régulation concernée, pas de cycle complet
+        if reconcile:
+            await self._coordinator.async_refresh_regulation(reg_id)